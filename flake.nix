@@ -29,7 +29,6 @@
           # Project dependencies
           rich
           click
-          tomli
           pathspec
 
           # Analysis tools that will be wrapped
@@ -118,7 +117,6 @@
           propagatedBuildInputs = with python.pkgs; [
             rich
             click
-            tomli
             pathspec
             radon
             pylint
@@ -24,9 +24,9 @@ def temp_db():
 
 
 @pytest.fixture
-def storage(temp_db):
-    """Create a MetricsStorage instance with temporary database."""
-    return MetricsStorage(db_path=temp_db)
+def storage():
+    """Create a MetricsStorage instance with an in-memory database."""
+    return MetricsStorage(db_path=":memory:")
 
 
 def test_init_db_creates_table(temp_db):
@@ -65,18 +65,43 @@ def test_save_metrics(storage):
     assert recent_errors[0]["message"] == "Test failed"
 
 
+def test_save_metrics_batch(storage):
+    """Test saving several metrics records in one transaction."""
+    last_id = storage.save_metrics_batch(
+        [{"avg_complexity": 1.0}, {"avg_complexity": 2.0}],
+        [{"tool": "ruff", "message": "Style check failed"}],
+    )
+
+    history = storage.get_history()
+    assert len(history) == 2
+    assert last_id == max(row["id"] for row in history)
+    assert storage.get_recent_errors()[0]["tool"] == "ruff"
+
+
+def test_wal_journal_mode(temp_db):
+    """Test that the shared connection uses write-ahead logging."""
+    storage = MetricsStorage(db_path=temp_db)
+    mode = storage.conn.execute("PRAGMA journal_mode").fetchone()[0]
+    assert mode == "wal"
+
+
+def test_close_releases_connection(storage):
+    """Test that the connection cannot be used once closed."""
+    storage.save_metrics({"avg_complexity": 5.0}, [])
+    assert storage.get_latest()["avg_complexity"] == 5.0
+
+    storage.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        storage.get_latest()
+
+
 def test_get_latest(storage):
     """Test retrieving the latest metrics."""
-    import time
-
     # Save some metrics
     metrics1 = {"avg_complexity": 5.0}
     metrics2 = {"avg_complexity": 6.0}
 
     storage.save_metrics(metrics1, [])
-    time.sleep(
-        1.1
-    )  # Ensure different timestamps (SQLite CURRENT_TIMESTAMP has second precision)
     storage.save_metrics(metrics2, [])
 
     latest = storage.get_latest()
@@ -86,14 +111,9 @@ def test_get_latest(storage):
 
 def test_get_history(storage):
     """Test retrieving metrics history."""
-    import time
-
     # Save multiple metrics
     for i in range(5):
         storage.save_metrics({"avg_complexity": float(i)}, [])
-        time.sleep(
-            1.1
-        )  # Ensure different timestamps (SQLite CURRENT_TIMESTAMP has second precision)
 
     history = storage.get_history(limit=3)
     assert len(history) == 3
@@ -103,15 +123,26 @@ def test_get_history(storage):
     assert history[2]["avg_complexity"] == 2.0
 
 
+def test_get_dashboard_state(storage):
+    """Test reading history and recent errors together."""
+    for complexity in [1.0, 2.0, 3.0]:
+        storage.save_metrics(
+            {"avg_complexity": complexity},
+            [{"tool": "ruff", "message": f"run {complexity}"}],
+        )
+
+    history, errors = storage.get_dashboard_state(history_limit=2, error_limit=1)
+
+    assert [h["avg_complexity"] for h in history] == [3.0, 2.0]
+    assert history == storage.get_history(limit=2)
+    assert errors == storage.get_recent_errors(limit=1)
+    assert not storage.conn.in_transaction
+
+
 def test_get_previous(storage):
     """Test retrieving the previous metrics entry."""
-    import time
-
     # Save two metrics
     storage.save_metrics({"avg_complexity": 5.0}, [])
-    time.sleep(
-        1.1
-    )  # Ensure different timestamps (SQLite CURRENT_TIMESTAMP has second precision)
     storage.save_metrics({"avg_complexity": 6.0}, [])
 
     previous = storage.get_previous()
@@ -119,6 +150,39 @@ def test_get_previous(storage):
     assert previous["avg_complexity"] == 5.0
 
 
+def test_ts_ns_migration_backfills_existing_rows(temp_db):
+    """Test that databases without ts_ns get the column and keep their order."""
+    with sqlite3.connect(temp_db) as conn:
+        conn.execute(
+            """
+            CREATE TABLE metrics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                avg_complexity REAL,
+                maintainability_index REAL,
+                test_coverage REAL,
+                code_duplication REAL,
+                total_functions INTEGER,
+                total_classes INTEGER,
+                total_lines INTEGER,
+                raw_data TEXT
+            )
+        """
+        )
+        conn.execute(
+            "INSERT INTO metrics (timestamp, avg_complexity) VALUES (?, ?)",
+            ("2024-01-01 00:00:00", 5.0),
+        )
+        conn.commit()
+
+    storage = MetricsStorage(db_path=temp_db)
+    storage.save_metrics({"avg_complexity": 6.0}, [])
+
+    history = storage.get_history()
+    assert [row["avg_complexity"] for row in history] == [6.0, 5.0]
+    assert history[1]["ts_ns"] == 1704067200 * 1_000_000_000
+
+
 def test_cleanup_old_entries(storage):
     """Test cleaning up old entries."""
     # This test would require mocking datetime or waiting
@@ -160,7 +224,7 @@ def test_row_to_dict_invalid_json(storage):
     """Test _row_to_dict with invalid JSON in raw_data."""
 
     # Manually insert a record with invalid JSON
-    with sqlite3.connect(storage.db_path) as conn:
+    with storage.conn as conn:
         conn.execute(
             """
             INSERT INTO metrics (avg_complexity, raw_data)
@@ -168,7 +232,6 @@ def test_row_to_dict_invalid_json(storage):
         """,
             (5.0, "invalid json {"),
         )
-        conn.commit()
 
     # Get the latest entry
     latest = storage.get_latest()
@@ -2,9 +2,12 @@
 Tests for the TUI module.
 """
 
+import io
+
+from rich.console import Console
 from rich.panel import Panel
 
-from viberdash.tui import DashboardUI
+from viberdash.tui import DEFAULT_THRESHOLDS, DashboardUI
 
 
 def test_dashboard_ui_init():
@@ -20,6 +23,12 @@ def test_dashboard_ui_custom_thresholds():
     ui = DashboardUI(thresholds=custom_thresholds)
     assert ui.thresholds["cyclomatic_complexity"]["good"] == 3.0
 
+    # Overrides do not leak into the shared defaults or other instances
+    assert DEFAULT_THRESHOLDS["cyclomatic_complexity"]["good"] == 5.0
+    other = DashboardUI()
+    assert other.thresholds["cyclomatic_complexity"]["good"] == 5.0
+    assert other.console is ui.console
+
 
 def test_get_status():
     """Test status determination based on thresholds."""
@@ -39,6 +48,14 @@ def test_get_status():
     assert status == "✓ Good"
     assert color == "green"
 
+    # Test boundaries: thresholds themselves count as good and bad
+    for value, expected in [(5.0, "✓ Good"), (7.0, "~ OK"), (10.0, "✗ Bad")]:
+        status, _ = ui._get_status(value, "cyclomatic_complexity", True)
+        assert status == expected
+    for value, expected in [(80.0, "✓ Good"), (70.0, "~ OK"), (60.0, "✗ Bad")]:
+        status, _ = ui._get_status(value, "test_coverage", False)
+        assert status == expected
+
     # Test None value
     status, color = ui._get_status(None, "test_coverage", lower_is_better=False)
     assert status == "? N/A"
@@ -59,6 +76,12 @@ def test_format_delta():
     assert "↑" in delta
     assert "red" in delta
 
+    # Test both directions when higher is better
+    assert ui._format_delta(82.5, 80.0, lower_is_better=False) == (
+        "[green]↑ 2.5[/green]"
+    )
+    assert ui._format_delta(77.5, 80.0, lower_is_better=False) == "[red]↓ 2.5[/red]"
+
     # Test no previous value
     delta = ui._format_delta(5.0, None, lower_is_better=True)
     assert delta == "-"
@@ -93,6 +116,15 @@ def test_create_sparkline():
     assert len(sparkline) == 3
 
 
+def test_sparkline_bars():
+    """Test mapping quality scores to sparkline bars."""
+    ui = DashboardUI()
+
+    assert ui._create_sparkline([1.0, 0.5, 0.0]) == "▁▄█"
+    # Out-of-range scores are clamped to the available bars
+    assert ui._create_sparkline([1.5, -0.5]) == "▁█"
+
+
 def test_convert_to_quality_scores():
     """Test converting values to quality scores."""
     ui = DashboardUI()
@@ -119,6 +151,19 @@ def test_convert_to_quality_scores():
     scores = ui._convert_to_quality_scores([], "test_coverage", lower_is_better=False)
     assert scores == []
 
+    # Test values exactly on the thresholds
+    scores = ui._convert_to_quality_scores(
+        [5.0, 10.0], "cyclomatic_complexity", lower_is_better=True
+    )
+    assert scores == [1.0, 0.0]
+
+    # Test equal good and bad thresholds
+    ui = DashboardUI({"test_coverage": {"good": 70.0, "bad": 70.0}})
+    scores = ui._convert_to_quality_scores(
+        [80.0, 70.0, 60.0], "test_coverage", lower_is_better=False
+    )
+    assert scores == [1.0, 1.0, 0.0]
+
 
 def test_format_int_delta():
     """Test integer delta formatting."""
@@ -178,6 +223,27 @@ def test_display_dashboard(capsys):
     assert ui.console.print.called
 
 
+def test_display_dashboard_single_write():
+    """Test that clearing and redrawing reach the terminal in one write."""
+    writes = []
+
+    class RecordingFile(io.StringIO):
+        def write(self, text):
+            writes.append(text)
+            return super().write(text)
+
+    ui = DashboardUI()
+    ui.console = Console(
+        file=RecordingFile(), force_terminal=True, width=120, height=40
+    )
+    latest = {"avg_complexity": 5.0, "timestamp": "2023-07-05 10:00:00"}
+
+    ui.display_dashboard(latest, [latest], [])
+
+    assert len(writes) == 1
+    assert "Code Quality Metrics" in writes[0]
+
+
 def test_show_scanning(capsys):
     """Test scanning status display."""
     from unittest.mock import MagicMock
@@ -205,3 +271,6 @@ def test_create_footer():
     from rich.panel import Panel
 
     assert isinstance(footer, Panel)
+
+    # The static footer is reused across redraws and instances
+    assert DashboardUI()._create_footer() is footer
@@ -4,11 +4,14 @@ Tests for the vibescan module.
 
 import signal
 import tempfile
+import threading
+import time
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 import pytest
 
+from viberdash.analyzer import CodeAnalyzer
 from viberdash.vibescan import ViberDashRunner, cli, load_config
 
 
@@ -52,10 +55,13 @@ def mock_analyzer():
 def mock_storage():
     """Mock MetricsStorage."""
     storage = MagicMock()
-    storage.get_history.return_value = [
-        {"avg_complexity": 5.0, "maintainability_index": 75.0},
-        {"avg_complexity": 5.5, "maintainability_index": 74.0},
-    ]
+    storage.get_dashboard_state.return_value = (
+        [
+            {"avg_complexity": 5.0, "maintainability_index": 75.0},
+            {"avg_complexity": 5.5, "maintainability_index": 74.0},
+        ],
+        [],
+    )
     return storage
 
 
@@ -77,6 +83,15 @@ def test_viberdash_runner_init(temp_source_dir):
     assert runner.running is True
 
 
+def test_viberdash_runner_reuses_analyzer(temp_source_dir):
+    """Test that ViberDashRunner keeps an analyzer passed in by the caller."""
+    analyzer = CodeAnalyzer(temp_source_dir)
+
+    runner = ViberDashRunner(temp_source_dir, analyzer=analyzer)
+
+    assert runner.analyzer is analyzer
+
+
 def test_signal_handler(temp_source_dir):
     """Test signal handler for graceful shutdown."""
     runner = ViberDashRunner(temp_source_dir)
@@ -85,6 +100,26 @@ def test_signal_handler(temp_source_dir):
         runner._signal_handler(signal.SIGINT, None)
 
     assert runner.running is False
+    assert runner._stop.is_set()
+
+
+@patch("viberdash.vibescan.CodeAnalyzer")
+@patch("viberdash.vibescan.MetricsStorage")
+@patch("viberdash.vibescan.DashboardUI")
+def test_run_stops_without_waiting_for_interval(
+    mock_ui_cls, mock_storage_cls, mock_analyzer_cls, temp_source_dir
+):
+    """Test that a stop request ends the loop without sleeping out the interval."""
+    runner = ViberDashRunner(temp_source_dir)
+    threading.Timer(0.05, runner._stop.set).start()
+
+    start = time.monotonic()
+    runner.run(interval=60)
+
+    assert time.monotonic() - start < 5
+    mock_analyzer_cls.return_value.run_analysis.assert_called_once()
+    mock_analyzer_cls.return_value.close.assert_called_once()
+    mock_storage_cls.return_value.close.assert_called_once()
 
 
 @patch("viberdash.vibescan.CodeAnalyzer")
@@ -100,8 +135,7 @@ def test_perform_scan(
     mock_analyzer_cls.return_value = mock_analyzer
 
     mock_storage = MagicMock()
-    mock_storage.get_history.return_value = [{"avg_complexity": 5.0}]
-    mock_storage.get_recent_errors.return_value = []
+    mock_storage.get_dashboard_state.return_value = ([{"avg_complexity": 5.0}], [])
     mock_storage_cls.return_value = mock_storage
 
     mock_ui = MagicMock()
@@ -114,11 +148,90 @@ def test_perform_scan(
     mock_ui.show_scanning.assert_called_once()
     mock_analyzer.run_analysis.assert_called_once()
     mock_storage.save_metrics.assert_called_once_with({"avg_complexity": 5.0}, [])
-    mock_storage.get_history.assert_called_once_with(limit=20)
-    mock_storage.get_recent_errors.assert_called_once_with(limit=5)
+    mock_storage.get_dashboard_state.assert_called_once_with(
+        history_limit=20, error_limit=5
+    )
     mock_ui.display_dashboard.assert_called_once()
 
 
+@patch("viberdash.vibescan.CodeAnalyzer")
+@patch("viberdash.vibescan.MetricsStorage")
+@patch("viberdash.vibescan.DashboardUI")
+def test_perform_scan_skips_unchanged_sources(
+    mock_ui_cls, mock_storage_cls, mock_analyzer_cls, temp_source_dir
+):
+    """Test that a scan is skipped when no source file changed."""
+    mock_analyzer = mock_analyzer_cls.return_value
+    mock_analyzer.run_analysis.return_value = ({"avg_complexity": 5.0}, [])
+    mock_analyzer.source_snapshot.return_value = (("example.py", 1, 10),)
+    mock_storage_cls.return_value.get_dashboard_state.return_value = ([{}], [])
+
+    runner = ViberDashRunner(temp_source_dir)
+    runner._perform_scan()
+    runner._perform_scan()
+    assert mock_analyzer.run_analysis.call_count == 1
+    assert mock_storage_cls.return_value.save_metrics.call_count == 1
+
+    # A changed file triggers a new scan
+    mock_analyzer.source_snapshot.return_value = (("example.py", 2, 12),)
+    runner._perform_scan()
+    assert mock_analyzer.run_analysis.call_count == 2
+
+
+@patch("viberdash.vibescan.CodeAnalyzer")
+@patch("viberdash.vibescan.MetricsStorage")
+@patch("viberdash.vibescan.DashboardUI")
+def test_perform_scan_retries_scan_with_errors(
+    mock_ui_cls, mock_storage_cls, mock_analyzer_cls, temp_source_dir
+):
+    """Test that a scan that reported errors is not skipped next time."""
+    mock_analyzer = mock_analyzer_cls.return_value
+    error = {"tool": "pytest", "message": "Test coverage analysis timed out"}
+    mock_analyzer.run_analysis.return_value = ({}, [error])
+    mock_analyzer.source_snapshot.return_value = (("example.py", 1, 10),)
+    mock_storage_cls.return_value.get_dashboard_state.return_value = ([{}], [])
+
+    runner = ViberDashRunner(temp_source_dir)
+    runner._perform_scan()
+    runner._perform_scan()
+    assert mock_analyzer.run_analysis.call_count == 2
+
+    # Once a scan succeeds, unchanged sources are skipped again
+    mock_analyzer.run_analysis.return_value = ({}, [])
+    runner._perform_scan()
+    runner._perform_scan()
+    assert mock_analyzer.run_analysis.call_count == 3
+
+
+@patch("viberdash.vibescan.CodeAnalyzer")
+@patch("viberdash.vibescan.MetricsStorage")
+@patch("viberdash.vibescan.DashboardUI")
+def test_perform_scan_appends_to_history_window(
+    mock_ui_cls, mock_storage_cls, mock_analyzer_cls, temp_source_dir
+):
+    """Test that later scans fetch only the new row and keep a bounded window."""
+    mock_analyzer = mock_analyzer_cls.return_value
+    mock_analyzer.run_analysis.return_value = ({}, [])
+    mock_analyzer.source_snapshot.side_effect = lambda: object()
+    mock_storage = mock_storage_cls.return_value
+    mock_storage.get_dashboard_state.return_value = (
+        [{"id": i} for i in range(20, 0, -1)],
+        [],
+    )
+
+    runner = ViberDashRunner(temp_source_dir)
+    runner._perform_scan()
+    mock_storage.get_dashboard_state.assert_called_with(history_limit=20, error_limit=5)
+
+    mock_storage.get_dashboard_state.return_value = ([{"id": 21}], [])
+    runner._perform_scan()
+    mock_storage.get_dashboard_state.assert_called_with(history_limit=1, error_limit=5)
+
+    latest, history, _errors = mock_ui_cls.return_value.display_dashboard.call_args[0]
+    assert latest == {"id": 21}
+    assert [row["id"] for row in history] == list(range(21, 1, -1))
+
+
 @patch("viberdash.vibescan.CodeAnalyzer")
 @patch("viberdash.vibescan.MetricsStorage")
 @patch("viberdash.vibescan.DashboardUI")
@@ -143,12 +256,11 @@ def test_perform_scan_error_handling(
     assert mock_analyzer.run_analysis.called
 
 
-@patch("viberdash.vibescan.time.sleep")
 @patch("viberdash.vibescan.CodeAnalyzer")
 @patch("viberdash.vibescan.MetricsStorage")
 @patch("viberdash.vibescan.DashboardUI")
 def test_run_main_loop(
-    mock_ui_cls, mock_storage_cls, mock_analyzer_cls, mock_sleep, temp_source_dir
+    mock_ui_cls, mock_storage_cls, mock_analyzer_cls, temp_source_dir
 ):
     """Test the main monitoring loop."""
     # Set up mocks
@@ -157,7 +269,7 @@ def test_run_main_loop(
     mock_analyzer_cls.return_value = mock_analyzer
 
     mock_storage = MagicMock()
-    mock_storage.get_history.return_value = [{"avg_complexity": 5.0}]
+    mock_storage.get_dashboard_state.return_value = ([{"avg_complexity": 5.0}], [])
     mock_storage_cls.return_value = mock_storage
 
     mock_ui_cls.return_value = MagicMock()
@@ -172,11 +284,10 @@ def test_run_main_loop(
         call_count += 1
         if call_count >= 2:
             runner.running = False
-        return
-
-    mock_sleep.side_effect = side_effect
+        return False
 
-    runner.run(interval=1)
+    with patch.object(runner._stop, "wait", side_effect=side_effect):
+        runner.run(interval=1)
 
     # Should have performed initial scan + 1 loop iteration
     assert mock_analyzer.run_analysis.call_count >= 2
@@ -267,6 +378,11 @@ def test_main_command_default_args(mock_load_config, mock_console_cls, mock_runn
         assert result.exit_code == 0
         mock_runner_cls.assert_called_once()
         mock_runner.run.assert_called_once_with(180)
+        # The analyzer used to count files is handed to the runner
+        analyzer = mock_runner_cls.call_args.kwargs["analyzer"]
+        assert isinstance(analyzer, CodeAnalyzer)
+        assert analyzer.source_dir == tmpdir_path.resolve()
+        assert analyzer.cache_file == Path.cwd() / ".viberdash_cache.json"
 
 
 @patch("viberdash.vibescan.Console")
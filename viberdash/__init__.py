@@ -1,11 +1,25 @@
 """ViberDash - Real-time code quality monitoring dashboard."""
 
+import importlib
+from typing import TYPE_CHECKING, Any
+
 __version__ = "0.1.0"
 
-from .analyzer import CodeAnalyzer
-from .storage import MetricsStorage
-from .tui import DashboardUI
-from .vibescan import ViberDashRunner, main
+if TYPE_CHECKING:
+    from .analyzer import CodeAnalyzer
+    from .storage import MetricsStorage
+    from .tui import DashboardUI
+    from .vibescan import ViberDashRunner, main
+
+# Public names and the submodules defining them; imported on first access
+# so that `import viberdash` does not pull in Rich, Click and radon
+_LAZY = {
+    "CodeAnalyzer": "analyzer",
+    "MetricsStorage": "storage",
+    "DashboardUI": "tui",
+    "ViberDashRunner": "vibescan",
+    "main": "vibescan",
+}
 
 __all__ = [
     "CodeAnalyzer",
@@ -14,3 +28,17 @@ __all__ = [
     "ViberDashRunner",
     "main",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    """Import public names from their submodules on first access."""
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(f".{_LAZY[name]}", __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted([*globals(), *_LAZY])
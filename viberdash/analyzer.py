@@ -1,18 +1,517 @@
 """Code analysis engine that runs various tools and collects metrics."""
 
+import ast
+import contextlib
 import fnmatch
+import functools
+import hashlib
 import json
 import logging
+import multiprocessing
+import os
+import re
+import signal
 import subprocess
 import sys
 import tempfile
+import threading
+import tokenize
+from collections.abc import Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Any
+from typing import Any, NamedTuple, TypeVar
 
 import pathspec
+import vulture
+from radon.complexity import cc_visit_ast
+from radon.metrics import h_visit_ast, mi_compute
+from radon.raw import analyze as raw_analyze
+from radon.visitors import ComplexityVisitor
+from vulture.config import make_config as make_vulture_config
+
+try:
+    from pylint.checkers.symilar import Symilar
+except ImportError:  # pragma: no cover - pylint < 3.3 named it similar.Similar
+    from pylint.checkers.similar import (  # type: ignore[import-not-found,no-redef]
+        Similar as Symilar,
+    )
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover - ijson is an optional speedup
+    ijson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - msgspec is an optional speedup
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speedup
+    orjson = None  # type: ignore[assignment]
 
 logger = logging.getLogger(__name__)
 
+# Patterns for counting code elements, compiled once at import time
+_CLASS_RE = re.compile(r"^class\s+\w+", re.MULTILINE)
+_DEF_CLASS_RE = re.compile(r"^\s*(def|class)\s+\w+", re.MULTILINE)
+
+# Patterns counted alongside lines in the single per-file scan pass
+_SCAN_PATTERNS = {"code_elements": _DEF_CLASS_RE, "classes": _CLASS_RE}
+_SCAN_KEY_BY_PATTERN = {regex: key for key, regex in _SCAN_PATTERNS.items()}
+# Keys of the per-file and total scan counts
+_SCAN_KEYS = ("lines", *_SCAN_PATTERNS)
+# Both patterns in one pass over raw bytes, so scanning never decodes a
+# file. Each match is a def or class at the start of a line, as for
+# _DEF_CLASS_RE; the group captures "class" only at column 0, as for
+# _CLASS_RE. Matching on the preceding newline rather than ^ gives the
+# regex engine a literal to search for, several times faster; the content
+# is prefixed with a newline so the first line is matched too. In bytes
+# \w is ASCII-only, so any UTF-8 lead byte may also start the name, as
+# non-ASCII letters do for the str patterns.
+_SCAN_BYTES_RE = re.compile(
+    rb"\n(?:[ \t\r\f\v]+(?:def|class)|def|(class))\s+(?:\w|[\x80-\xff])"
+)
+
+if msgspec is not None:
+
+    class RuffIssue(msgspec.Struct):
+        """The field of a ruff JSON diagnostic that ViberDash reads."""
+
+        code: str | None = None  # None for syntax errors
+
+    _RUFF_DECODER = msgspec.json.Decoder(list[RuffIssue])
+
+# A vulture report line: "path:line: message"
+_VULTURE_FINDING_RE = re.compile(rb"^[^\n]+:\d+:", re.MULTILINE)
+
+# The summary row of pytest-cov's terminal report, e.g. "TOTAL  454  36  92%"
+# (branch coverage adds columns); captures the final percentage
+_COVERAGE_TOTAL_RE = re.compile(
+    r"^[ \t]*TOTAL\S*(?:[ \t]+\S+){2,}[ \t]+(\S+?)%+[ \t\r]*$", re.MULTILINE
+)
+
+# How pylint's JSON output names a duplicate-code message
+_DUPLICATE_CODE_SYMBOL = b'"duplicate-code"'
+
+# Restricts a pylint run to the duplicate-code check; the empty rcfile keeps
+# the project's own pylint configuration out of it. -j 0 spreads the files
+# over one process per CPU, and nothing is written to pylint's stats cache
+_DUPLICATION_PYLINT_ARGS = (
+    f"--rcfile={os.devnull}",
+    "--disable=all",
+    "--enable=duplicate-code",
+    "--output-format=json",
+    "--jobs=0",
+    "--persistent=n",
+)
+
+# Characters of file arguments passed to one tool run; Windows limits a whole
+# command line to 32767 characters, POSIX systems allow far more
+_MAX_ARGV_CHARS = 30_000 if os.name == "nt" else 500_000
+
+# Below this many files, worker process startup costs more than it saves
+_PROCESS_POOL_MIN_FILES = 64
+# Files are sharded into about this many chunks per worker: few enough to
+# amortize pickling round trips, enough to even out slow files
+_PROCESS_POOL_CHUNKS_PER_WORKER = 4
+# Workers are replaced after this many chunks so that a long watch session
+# does not accumulate memory in them
+_PROCESS_POOL_MAX_TASKS_PER_CHILD = 100
+
+_T = TypeVar("_T")
+
+# Bumped whenever the per-file results stored in cache_file change shape
+_FILE_CACHE_VERSION = 1
+
+# (path, mtime_ns, size) of every input file; equal snapshots, equal inputs
+_Snapshot = tuple[tuple[str, int, int], ...]
+
+# Tool settings that change results without touching a Python file
+_TOOL_CONFIG_FILES = (
+    "pyproject.toml",
+    "ruff.toml",
+    ".ruff.toml",
+    ".coveragerc",
+    "setup.cfg",
+)
+
+
+def _snapshot_digest(snapshot: _Snapshot) -> str:
+    """Return a digest of a snapshot that is stable across processes."""
+    return hashlib.blake2b(repr(snapshot).encode(), digest_size=16).hexdigest()
+
+
+def _read_gitignore_patterns(gitignore_path: Path, root: Path) -> list[str]:
+    """Read a .gitignore file, rewriting its patterns relative to root.
+
+    Patterns in a .gitignore below root only apply inside its directory:
+    a pattern without an inner slash matches at any depth there, and one
+    with a slash is anchored to that directory.
+    """
+    try:
+        rel_dir = gitignore_path.parent.relative_to(root).as_posix()
+    except ValueError:
+        # Not under root, use the patterns as they are
+        rel_dir = "."
+
+    patterns = []
+    with open(gitignore_path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if rel_dir != ".":
+                negate = "!" if line.startswith("!") else ""
+                body = line[len(negate) :]
+                core = body.rstrip("/")
+                dir_suffix = body[len(core) :]
+                if "/" in core:
+                    line = f"{negate}{rel_dir}/{core.lstrip('/')}{dir_suffix}"
+                else:
+                    line = f"{negate}{rel_dir}/**/{core}{dir_suffix}"
+            patterns.append(line + "\n")
+    return patterns
+
+
+# Directories never worth descending into when collecting test files
+_SKIP_DIR_NAMES = frozenset({"__pycache__", "node_modules", "venv"})
+
+
+def _iter_py_files(root: Path) -> Iterator[str]:
+    """Yield the paths of ``.py`` files under root using os.scandir.
+
+    Hidden directories (``.venv``, ``.git``, ...) and caches are skipped.
+    No exclude patterns apply; use CodeAnalyzer._get_python_files for the
+    files to analyze.
+    """
+    stack = [os.fspath(root)]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not (
+                            entry.name.startswith(".") or entry.name in _SKIP_DIR_NAMES
+                        ):
+                            stack.append(entry.path)
+                    elif entry.name.endswith(".py") and entry.is_file():
+                        yield entry.path
+        except OSError as e:
+            logger.debug(f"Could not scan directory {directory}: {e}")
+
+
+def _scan_ancestors(start: Path) -> tuple[Path | None, list[Path]]:
+    """Walk up from start to the repository root, listing each directory once.
+
+    One os.scandir per directory answers both "is there a .git here?" and
+    "is there a .gitignore here?", instead of probing each name separately.
+
+    Returns:
+        The repository root, or None if there is none, and the .gitignore
+        files found on the way, nearest first
+    """
+    gitignore_files = []
+    current = start
+    while True:
+        try:
+            with os.scandir(current) as entries:
+                names = {entry.name for entry in entries}
+        except OSError as e:
+            logger.debug(f"Could not scan directory {current}: {e}")
+            names = set()
+
+        if ".gitignore" in names:
+            gitignore_files.append(current / ".gitignore")
+        if ".git" in names:
+            return current, gitignore_files
+
+        parent = current.parent
+        if parent == current:  # Reached filesystem root
+            return None, gitignore_files
+        current = parent
+
+
+def _bare_directory_names(patterns: list[str]) -> frozenset[str]:
+    """Collect directory names that gitignore patterns exclude at any depth.
+
+    Plain names such as ``build/`` or ``.venv`` match a directory of that name
+    anywhere in the tree, so they can be checked with a set lookup. Negated
+    patterns could re-include such a directory, so none are collected when
+    any are present.
+    """
+    names = set()
+    for line in patterns:
+        pattern = line.strip()
+        if pattern.startswith("!"):
+            return frozenset()
+        name = pattern.removesuffix("/")
+        if name and not any(char in name for char in "/\\*?["):
+            names.add(name)
+    return frozenset(names)
+
+
+def _scan_content(content: bytes) -> dict[str, int]:
+    """Count the lines and _SCAN_PATTERNS matches in a file's bytes.
+
+    Line counts match len(f.readlines()): a final line without a trailing
+    newline still counts.
+    """
+    counts = dict.fromkeys(_SCAN_KEYS, 0)
+    if not content:
+        return counts
+
+    counts["lines"] = content.count(b"\n") + (not content.endswith(b"\n"))
+    # One entry per match: b"class" for a top-level class, b"" otherwise
+    matches = _SCAN_BYTES_RE.findall(b"\n" + content)
+    counts["code_elements"] = len(matches)
+    counts["classes"] = len(matches) - matches.count(b"")
+    return counts
+
+
+class _RadonFileMetrics(NamedTuple):
+    """radon's cc, mi and raw results for one file."""
+
+    complexities: list[int]
+    mi: float | None  # None if the file does not parse
+    loc: int
+    sloc: int
+
+
+_NO_RADON_METRICS = _RadonFileMetrics([], None, 0, 0)
+
+
+def _radon_source_metrics(path: str, content: bytes) -> _RadonFileMetrics:
+    """Compute radon's cc, mi and raw metrics for a file's bytes in one pass.
+
+    The source is parsed once; the AST is shared by the complexity and
+    maintainability visitors. The maintainability index matches
+    ``radon mi``, which counts multi-line strings as comments.
+    """
+    try:
+        # Same newline translation as reading the file in text mode
+        code = content.decode("utf-8")
+        if "\r" in code:
+            code = code.replace("\r\n", "\n").replace("\r", "\n")
+        raw = raw_analyze(code)
+    except (SyntaxError, UnicodeDecodeError) as e:
+        logger.debug(f"Radon could not analyze {path}: {e}")
+        return _NO_RADON_METRICS
+
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        logger.debug(f"Radon could not parse {path}: {e}")
+        return _RadonFileMetrics([], None, raw.loc, raw.sloc)
+
+    comment_lines = raw.comments + raw.multi
+    comments = comment_lines / raw.sloc * 100 if raw.sloc else 0
+    mi = mi_compute(
+        h_visit_ast(tree).total.volume,
+        ComplexityVisitor.from_ast(tree).total_complexity,
+        raw.lloc,
+        comments,
+    )
+    complexities = [block.complexity for block in cc_visit_ast(tree)]
+    return _RadonFileMetrics(complexities, float(mi), raw.loc, raw.sloc)
+
+
+class _FileMetrics(NamedTuple):
+    """Everything one read of a source file yields."""
+
+    counts: dict[str, int]  # lines and _SCAN_PATTERNS matches
+    radon: _RadonFileMetrics  # _NO_RADON_METRICS unless radon was requested
+
+
+_NO_FILE_METRICS = _FileMetrics(dict.fromkeys(_SCAN_KEYS, 0), _NO_RADON_METRICS)
+
+
+def _analyze_file(path: str, radon: bool = True) -> _FileMetrics:
+    """Read a file once, scan its bytes and optionally run radon over them.
+
+    Line counts, pattern matches and radon's cc, mi and raw metrics all
+    come from the same read.
+    """
+    try:
+        content = Path(path).read_bytes()
+    except OSError as e:
+        logger.debug(f"Could not read {path}: {e}")
+        return _NO_FILE_METRICS
+    counts = _scan_content(content)
+    if not radon:
+        return _FileMetrics(counts, _NO_RADON_METRICS)
+    return _FileMetrics(counts, _radon_source_metrics(path, content))
+
+
+@functools.lru_cache(maxsize=128)
+def _compile_gitignore_spec(
+    root: str, gitignore_files: tuple[tuple[str, int], ...]
+) -> tuple[pathspec.PathSpec | None, frozenset[str]]:
+    """Compile .gitignore files into a single GitIgnoreSpec.
+
+    Later patterns take precedence, so with the files ordered from the
+    root down a deeper .gitignore overrides its parents, as in git.
+
+    Args:
+        root: Directory the patterns are made relative to, the repo root
+            if there is one
+        gitignore_files: (path, mtime_ns) pairs ordered from repo root down;
+            the mtime only serves as part of the cache key
+
+    Returns:
+        Compiled spec, or None if no patterns were found, and the directory
+        names that can be pruned without consulting the spec
+    """
+    gitignore_patterns = []
+    for gitignore_path, _mtime_ns in gitignore_files:
+        try:
+            gitignore_patterns.extend(
+                _read_gitignore_patterns(Path(gitignore_path), Path(root))
+            )
+        except Exception as e:
+            logger.debug(f"Could not load .gitignore from {gitignore_path}: {e}")
+
+    if not gitignore_patterns:
+        return None, frozenset()
+    # GitIgnoreSpec follows git's own precedence rules for negated patterns
+    return (
+        pathspec.GitIgnoreSpec.from_lines(gitignore_patterns),
+        _bare_directory_names(gitignore_patterns),
+    )
+
+
+def _count_dead_code(paths: list[str]) -> int:
+    """Count the unused code items vulture reports for the given paths.
+
+    Applies the [tool.vulture] settings of ./pyproject.toml, as the vulture
+    command line does.
+    """
+    config = make_vulture_config(paths)
+    scanner = vulture.Vulture(
+        verbose=False,
+        ignore_names=config["ignore_names"],
+        ignore_decorators=config["ignore_decorators"],
+    )
+    scanner.scavenge(config["paths"], exclude=config["exclude"])
+    return len(scanner.get_unused_code(min_confidence=config["min_confidence"]))
+
+
+def _count_duplicate_blocks(files: list[str]) -> int:
+    """Count the blocks of similar lines pylint's duplicate-code check reports.
+
+    Uses the checker's defaults: at least four similar lines, ignoring
+    comments, docstrings, imports and signatures. As in pylint, only lines
+    shared between different files count.
+    """
+    symilar = Symilar(
+        min_lines=4,
+        ignore_comments=True,
+        ignore_docstrings=True,
+        ignore_imports=True,
+        ignore_signatures=True,
+    )
+    for path in files:
+        try:
+            # tokenize.open honours coding declarations, as pylint does
+            with tokenize.open(path) as stream:
+                symilar.append_stream(path, stream)
+        except (OSError, SyntaxError) as e:
+            logger.debug(f"Could not read {path} for duplication analysis: {e}")
+    # _compute_sims is private pylint API; callers fall back to running
+    # pylint when it changes
+    return len(symilar._compute_sims())
+
+
+def _worker_count() -> int:
+    """Return the number of worker processes to use."""
+    return os.cpu_count() or 1
+
+
+def _kill_process_group(proc: subprocess.Popen) -> None:
+    """Kill a tool started in its own session, with any processes it started."""
+    try:
+        if os.name == "posix":
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except OSError:  # Already gone
+        pass
+
+
+@functools.lru_cache(maxsize=1)
+def _ruff_command() -> tuple[str, ...]:
+    """Return the command that starts ruff.
+
+    ruff is a native binary; running the one its Python package ships
+    directly saves starting an interpreter only to exec it.
+    """
+    try:
+        from ruff.__main__ import find_ruff_bin
+
+        return (os.fsdecode(find_ruff_bin()),)
+    except (ImportError, FileNotFoundError):
+        return (sys.executable, "-m", "ruff")
+
+
+def _argv_batches(
+    files: list[str], max_chars: int = _MAX_ARGV_CHARS
+) -> Iterator[list[str]]:
+    """Split file arguments into batches of at most max_chars characters."""
+    batch: list[str] = []
+    size = 0
+    for path in files:
+        if batch and size + len(path) + 1 > max_chars:
+            yield batch
+            batch, size = [], 0
+        batch.append(path)
+        size += len(path) + 1
+    if batch:
+        yield batch
+
+
+def _decode_output(output: bytes | str | None) -> str:
+    """Return captured tool output as text, replacing undecodable bytes."""
+    if isinstance(output, bytes):
+        return output.decode("utf-8", errors="replace")
+    return output or ""
+
+
+def _json_object_items(stream: Any) -> Iterator[tuple[str, Any]]:
+    """Stream the (key, value) pairs of a top-level JSON object."""
+    return ijson.kvitems(stream, "")  # type: ignore[no-any-return]
+
+
+def _json_array_items(stream: Any) -> Iterator[Any]:
+    """Stream the elements of a top-level JSON array."""
+    return ijson.items(stream, "item")  # type: ignore[no-any-return]
+
+
+def _is_missing_module(result: subprocess.CompletedProcess) -> bool:
+    """Check whether a ``python -m`` tool failed because it was not found."""
+    return result.returncode == 1 and "No module named" in _decode_output(result.stderr)
+
+
+def _is_docstring_issue(violation: Any) -> bool:
+    """Check whether a ruff diagnostic comes from the pydocstyle (D) rules."""
+    code = violation.get("code") if isinstance(violation, dict) else violation.code
+    return isinstance(code, str) and code.startswith("D")
+
+
+@functools.lru_cache(maxsize=32)
+def _compile_exclude_patterns(patterns: tuple[str, ...]) -> re.Pattern[str] | None:
+    """Combine fnmatch-style exclude patterns into a single regex.
+
+    Matching the result is equivalent to fnmatch.fnmatch against any one
+    pattern, but translates each pattern once instead of on every call.
+    """
+    if not patterns:
+        return None
+    return re.compile(
+        "|".join(fnmatch.translate(os.path.normcase(p)) for p in patterns)
+    )
+
 
 class CodeAnalyzer:
     """Runs code analysis tools and collects metrics."""
@@ -22,159 +521,333 @@ class CodeAnalyzer:
         self.source_dir = Path(source_dir).resolve()
         if not self.source_dir.exists():
             raise ValueError(f"Source directory does not exist: {self.source_dir}")
+        # The package pytest-cov measures
+        self._module_name = self.source_dir.name
 
         self.config = config or {}
         self.exclude_patterns = self.config.get("exclude_patterns", [])
+        self._exclude_re = _compile_exclude_patterns(tuple(self.exclude_patterns))
         self.respect_gitignore = self.config.get("respect_gitignore", True)
+        # radon and vulture run in-process unless subprocesses are requested
+        self.use_subprocess = self.config.get("use_subprocess", False)
+
+        # Filtered file list, shared by every lookup within one run_analysis
+        self._python_files_cache: list[Path] | None = None
+        # Walk taken by source_snapshot, handed to the next run_analysis
+        self._snapshot_files: list[Path] | None = None
+
+        # Worker processes for CPU-bound per-file radon passes, created lazily
+        self.process_pool_min_files = self.config.get(
+            "process_pool_min_files", _PROCESS_POOL_MIN_FILES
+        )
+        self._pool: ProcessPoolExecutor | None = None
+        self._pool_lock = threading.Lock()
+
+        # Tool processes currently running, so cancel() can kill them
+        self._processes: set[subprocess.Popen] = set()
+        self._processes_lock = threading.Lock()
+        self._cancelled = threading.Event()
+        # Python tools that fail to import in isolated mode
+        self._needs_site: set[str] = set()
+
+        # Per-file scan results keyed by path, tagged with (mtime_ns, size),
+        # optionally persisted to cache_file so later runs start warm
+        cache_file = self.config.get("cache_file")
+        self.cache_file = Path(cache_file) if cache_file else None
+        self._file_cache: dict[Path, tuple[tuple[int, int], _FileMetrics]] = {}
+        self._file_cache_lock = threading.Lock()
+        self._file_cache_dirty = False
+        # Last successful coverage result, with a digest of the file
+        # snapshot it was for; persisted to cache_file along with the above
+        self._coverage_cache: tuple[str, float] | None = None
+        if self.cache_file is not None:
+            self._load_file_cache(self.cache_file)
+
+        # Results shared by the analyses of one run_analysis call, with a
+        # lock per entry so concurrent analyses compute each only once
+        self._in_run = False
+        self._run_results: dict[str, Any] = {}
+        self._run_locks = {key: threading.Lock() for key in ("scan", "ruff")}
+
+        # The repository root does not move, so look it up once, noting the
+        # .gitignore files between it and source_dir on the way
+        self._repo_root, self._ancestor_gitignores = _scan_ancestors(self.source_dir)
+        # Prepended to source-relative paths to make them repo-relative
+        self._gitignore_prefix = ""
+        if self._repo_root is not None and self._repo_root != self.source_dir:
+            self._gitignore_prefix = (
+                self.source_dir.relative_to(self._repo_root).as_posix() + "/"
+            )
 
         # Create pathspec for gitignore patterns if requested
         self.gitignore_spec: pathspec.PathSpec | None = None
+        self._ignored_dir_names: frozenset[str] = frozenset()
+        self._gitignore_paths: list[Path] = []
+        self._base_gitignores: list[Path] = []
+        self._nested_gitignores: list[Path] = []
         if self.respect_gitignore:
             self._load_gitignore_patterns()
 
     def _load_gitignore_patterns(self) -> None:
-        """Load patterns from .gitignore file if it exists."""
-        # Collect all gitignore patterns from repo root to source dir
-        # Note: This doesn't perfectly replicate git's behavior
-        gitignore_patterns = []
+        """Load patterns from the .gitignore files down to source_dir.
 
-        # Find all .gitignore files from source_dir up to repository root
-        gitignore_files = self._find_gitignore_files()
-
-        for gitignore_path in gitignore_files:
-            try:
-                with open(gitignore_path, encoding="utf-8") as f:
-                    # For subdirectory .gitignore files, we need to adjust patterns
-                    # to be relative to the source directory
-                    base_dir = gitignore_path.parent
-                    for line in f:
-                        line = line.strip()
-                        if line and not line.startswith("#"):
-                            if base_dir != self.source_dir:
-                                # Adjust pattern to be relative to source_dir
-                                try:
-                                    rel_dir = base_dir.relative_to(self.source_dir)
-                                    # Prepend the relative directory path
-                                    if line.startswith("/"):
-                                        # Absolute path in gitignore
-                                        adjusted = str(rel_dir / line[1:])
-                                    else:
-                                        # Relative pattern - applies to subdirs
-                                        adjusted = str(rel_dir / line)
-                                    gitignore_patterns.append(adjusted + "\n")
-                                except ValueError:
-                                    # If base_dir is not under source_dir, use as-is
-                                    gitignore_patterns.append(line + "\n")
-                            else:
-                                gitignore_patterns.append(line + "\n")
-            except Exception as e:
-                logger.debug(f"Could not load .gitignore from {gitignore_path}: {e}")
-
-        if gitignore_patterns:
-            # Create PathSpec from all collected patterns
-            self.gitignore_spec = pathspec.PathSpec.from_lines(
-                "gitwildmatch", gitignore_patterns
-            )
-
-    def _find_gitignore_files(self) -> list[Path]:
-        """Find all .gitignore files from source directory up to repository root."""
-        gitignore_files = []
-
-        # First, find the repository root (where .git directory is)
-        repo_root = self._find_repo_root()
-        if not repo_root:
+        .gitignore files below source_dir are picked up by the file walk,
+        which lists every directory anyway.
+        """
+        if self._repo_root is None:
             # If no repo root found, just check source directory
-            gitignore = self.source_dir / ".gitignore"
-            if gitignore.exists():
-                gitignore_files.append(gitignore)
-            # Also check for gitignore files in subdirectories
-            for gitignore in self.source_dir.rglob(".gitignore"):
-                if gitignore not in gitignore_files:
-                    gitignore_files.append(gitignore)
-            return gitignore_files
-
-        # Collect .gitignore files from repo root down to source directory
-        current = self.source_dir
-        while True:
-            gitignore = current / ".gitignore"
-            if gitignore.exists():
-                gitignore_files.append(gitignore)
-
-            if current == repo_root:
-                break
+            self._base_gitignores = [
+                gitignore
+                for gitignore in self._ancestor_gitignores
+                if gitignore.parent == self.source_dir
+            ]
+        else:
+            # In order from repo root to source directory
+            self._base_gitignores = list(reversed(self._ancestor_gitignores))
+        self._compile_gitignore_files(self._base_gitignores)
 
-            parent = current.parent
-            if parent == current:  # Reached filesystem root
-                break
-            current = parent
+    def _set_nested_gitignores(self, nested: list[Path]) -> None:
+        """Recompile gitignore_spec if the set of nested .gitignore files changed.
 
-        # Also find .gitignore files in subdirectories of source_dir
-        for gitignore in self.source_dir.rglob(".gitignore"):
-            if gitignore not in gitignore_files:
-                gitignore_files.append(gitignore)
+        Args:
+            nested: .gitignore files found below source_dir
+        """
+        nested = sorted(nested, key=lambda path: (len(path.parts), path))
+        if nested == self._nested_gitignores:
+            return
+        self._nested_gitignores = nested
+        self._compile_gitignore_files(self._base_gitignores + nested)
+
+    def _compile_gitignore_files(self, gitignore_paths: list[Path]) -> None:
+        """Set gitignore_spec from the given .gitignore files, in order."""
+        self._gitignore_paths = gitignore_paths
+        # Key the compiled spec on each file's mtime so edits invalidate it
+        gitignore_files = []
+        for gitignore_path in gitignore_paths:
+            try:
+                mtime_ns = gitignore_path.stat().st_mtime_ns
+            except OSError as e:
+                logger.debug(f"Could not stat .gitignore at {gitignore_path}: {e}")
+                continue
+            gitignore_files.append((str(gitignore_path), mtime_ns))
+
+        self.gitignore_spec, self._ignored_dir_names = _compile_gitignore_spec(
+            str(self._repo_root or self.source_dir), tuple(gitignore_files)
+        )
 
-        # Return in order from repo root to source directory, then subdirectories
-        return list(reversed(gitignore_files))
+    def _refresh_gitignore_spec(self) -> None:
+        """Recompile gitignore_spec if one of its .gitignore files changed.
 
-    def _find_repo_root(self) -> Path | None:
-        """Find the repository root by looking for .git directory."""
-        current = self.source_dir
-        while True:
-            if (current / ".git").exists():
-                return current
+        The compiled spec is cached on the files' mtimes, so while none has
+        changed this costs one stat per file and reuses the same spec.
+        """
+        if self._gitignore_paths:
+            self._compile_gitignore_files(self._gitignore_paths)
 
-            parent = current.parent
-            if parent == current:  # Reached filesystem root
-                return None
-            current = parent
+    def _is_excluded(
+        self, path_str: str, is_dir: bool, parents_checked: bool = False
+    ) -> bool:
+        """Check a POSIX path relative to source_dir against all patterns.
 
-    def _should_exclude_path(self, path: Path) -> bool:
-        """Check if a path should be excluded based on patterns."""
-        # Convert to relative path from source_dir for pattern matching
-        try:
-            rel_path = path.relative_to(self.source_dir)
-        except ValueError:
-            # Path is not under source_dir
-            return True
-
-        path_str = str(rel_path)
-        path_parts = path_str.split("/")
-
-        # Check against exclude patterns
-        for pattern in self.exclude_patterns:
-            # Check if any part of the path matches the pattern
-            for part in path_parts:
-                if fnmatch.fnmatch(part, pattern):
-                    return True
-            # Also check the full path
-            if fnmatch.fnmatch(path_str, pattern):
+        Args:
+            path_str: Path relative to source_dir, with ``/`` separators
+            is_dir: Whether the path is a directory
+            parents_checked: Whether its directories already passed this
+                check, as they have during the file walk, so only the last
+                part needs matching against the exclude patterns
+        """
+        # Check any part of the path, then the full path, against the
+        # exclude patterns
+        if self._exclude_re is not None:
+            match = self._exclude_re.match
+            parts = (
+                path_str.rsplit("/", 1)[-1:] if parents_checked else path_str.split("/")
+            )
+            if any(match(os.path.normcase(part)) for part in parts):
+                return True
+            if match(os.path.normcase(path_str)):
                 return True
 
         # Check against gitignore patterns using pathspec
         if self.respect_gitignore and self.gitignore_spec:
-            # For gitignore, we need to check from the perspective of the repo root
-            repo_root = self._find_repo_root()
-            if repo_root:
-                try:
-                    # Get path relative to repo root for gitignore matching
-                    repo_rel_path = path.relative_to(repo_root)
-                    if self.gitignore_spec.match_file(str(repo_rel_path)):
-                        return True
-                except ValueError:
-                    # Path is not under repo root, use source-relative path
-                    if self.gitignore_spec.match_file(path_str):
-                        return True
-            else:
-                # No repo root, use source-relative path
-                if self.gitignore_spec.match_file(path_str):
-                    return True
+            # Common prune directories are caught by name alone
+            if is_dir and path_str.rsplit("/", 1)[-1] in self._ignored_dir_names:
+                return True
+
+            # Gitignore patterns are relative to the repo root, if there is one
+            dir_suffix = "/" if is_dir else ""
+            if self.gitignore_spec.match_file(
+                self._gitignore_prefix + path_str + dir_suffix
+            ):
+                return True
 
         return False
 
+    def _iter_python_files(self) -> Iterator[Path]:
+        """Walk source_dir with os.scandir, yielding files to analyze.
+
+        Excluded directories are pruned before descending into them, and
+        only ``.py`` entries are matched against the exclude patterns.
+        ``.gitignore`` files met on the way are added to gitignore_spec
+        before the entries they govern are matched.
+        """
+        nested_gitignores: list[Path] = []
+        # Each directory travels with its source-relative prefix, so entries
+        # are matched without re-deriving their relative path
+        stack = [(os.fspath(self.source_dir), "")]
+        while stack:
+            directory, prefix = stack.pop()
+            try:
+                with os.scandir(directory) as it:
+                    entries = list(it)
+            except OSError as e:
+                logger.debug(f"Could not scan directory {directory}: {e}")
+                continue
+
+            if prefix and self.respect_gitignore:
+                gitignore = self._find_gitignore(entries)
+                if gitignore is not None:
+                    nested_gitignores.append(gitignore)
+                    if gitignore not in self._nested_gitignores:
+                        self._set_nested_gitignores(
+                            [*self._nested_gitignores, gitignore]
+                        )
+
+            for entry in entries:
+                rel_path = prefix + entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name != ".git" and not self._is_excluded(
+                            rel_path, is_dir=True, parents_checked=True
+                        ):
+                            stack.append((entry.path, rel_path + "/"))
+                    elif (
+                        entry.name.endswith(".py")
+                        and entry.is_file()
+                        and not self._is_excluded(
+                            rel_path, is_dir=False, parents_checked=True
+                        )
+                    ):
+                        yield Path(entry.path)
+                except OSError as e:
+                    logger.debug(f"Could not scan {entry.path}: {e}")
+
+        # Drop .gitignore files that have since been deleted
+        if self.respect_gitignore:
+            self._set_nested_gitignores(nested_gitignores)
+
+    @staticmethod
+    def _find_gitignore(entries: list[os.DirEntry[str]]) -> Path | None:
+        """Return the .gitignore file among a directory's entries, if any."""
+        for entry in entries:
+            if entry.name == ".gitignore":
+                return Path(entry.path) if entry.is_file() else None
+        return None
+
     def _get_python_files(self) -> list[Path]:
-        """Get all Python files that should be analyzed (after filtering)."""
-        all_files = list(self.source_dir.rglob("*.py"))
-        return [f for f in all_files if not self._should_exclude_path(f)]
+        """Get all Python files that should be analyzed (after filtering).
+
+        source_dir is walked afresh, except during run_analysis, whose
+        lookups all share the walk it starts with.
+        """
+        if self._python_files_cache is not None:
+            return list(self._python_files_cache)
+        return list(self._iter_python_files())
+
+    def refresh(self) -> None:
+        """Pick up edits to the known .gitignore files."""
+        self._refresh_gitignore_spec()
+
+    def source_snapshot(self) -> _Snapshot:
+        """Return (path, mtime_ns, size) for every analyzed file and test file.
+
+        Tool configuration files next to the sources, the tests and at the
+        repository root are included, since editing them changes results.
+        Equal snapshots mean a new analysis would see the same inputs, so
+        callers can skip it. The file list is walked afresh, and the next
+        run_analysis analyzes that same list instead of walking again.
+        """
+        self.refresh()
+        self._snapshot_files = self._get_python_files()
+        test_dir, _ = self._find_test_directory()
+        return self._snapshot_with_tests(self._snapshot_files, test_dir)
+
+    def _snapshot_with_tests(
+        self, files: list[Path], test_dir: Path | None
+    ) -> _Snapshot:
+        """Return (path, mtime_ns, size) for files, test_dir's and tool configs."""
+        paths = set(files)
+        config_dirs = {self.source_dir}
+        if test_dir:
+            paths.update(map(Path, _iter_py_files(test_dir)))
+            config_dirs.add(test_dir.parent)
+        if self._repo_root:
+            config_dirs.add(self._repo_root)
+        paths.update(d / name for d in config_dirs for name in _TOOL_CONFIG_FILES)
+
+        snapshot = []
+        for path in sorted(paths):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            snapshot.append((str(path), stat.st_mtime_ns, stat.st_size))
+        return tuple(snapshot)
+
+    def _map_files(self, func: Callable[[str], _T], files: list[str]) -> list[_T]:
+        """Apply a per-file function to every file, in order.
+
+        Large file sets are spread over worker processes, since radon's
+        parsing is CPU-bound and threads would serialize on the GIL.
+        func must be a module-level function so it can be pickled.
+
+        Args:
+            func: Function taking a file path
+            files: File paths to process
+
+        Returns:
+            Results of func for each file
+        """
+        if len(files) < self.process_pool_min_files:
+            return [func(path) for path in files]
+
+        pool = self._process_pool()
+        chunksize = max(
+            1, len(files) // (_worker_count() * _PROCESS_POOL_CHUNKS_PER_WORKER)
+        )
+        return list(pool.map(func, files, chunksize=chunksize))
+
+    def _run_on_files(self, func: Callable[[list[str]], _T], files: list[str]) -> _T:
+        """Call func on the whole file set, in a worker process if it is large.
+
+        For whole-program analyses (vulture, duplicate detection) that cannot
+        be split per file: moving them off the analysis thread keeps them
+        from holding the GIL while the other analyses run. func must be a
+        module-level function so it can be pickled.
+        """
+        if len(files) < self.process_pool_min_files:
+            return func(files)
+        return self._process_pool().submit(func, files).result()
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        """Return the worker process pool, creating it on first use."""
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn avoids forking while other analysis threads are running
+                self._pool = ProcessPoolExecutor(
+                    max_workers=_worker_count(),
+                    mp_context=multiprocessing.get_context("spawn"),
+                    max_tasks_per_child=_PROCESS_POOL_MAX_TASKS_PER_CHILD,
+                )
+            return self._pool
+
+    def close(self) -> None:
+        """Kill running tools and shut down worker processes, if any."""
+        self._kill_running_processes()
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
 
     def run_analysis(self) -> tuple[dict[str, Any], list[dict[str, str]]]:
         """Run all analysis tools and return aggregated metrics and errors.
@@ -186,8 +859,14 @@ class CodeAnalyzer:
         metrics: dict[str, Any] = {}
         errors: list[dict[str, str]] = []
 
-        # Get the list of files to analyze
-        python_files = self._get_python_files()
+        self._cancelled.clear()
+
+        # Get the list of files to analyze, from source_snapshot's walk if
+        # one was just taken; later lookups reuse this list
+        self.refresh()
+        python_files, self._snapshot_files = self._snapshot_files, None
+        if python_files is None:
+            python_files = self._get_python_files()
         if not python_files:
             errors.append(
                 {"tool": "viberdash", "message": "No Python files found to analyze."}
@@ -196,54 +875,154 @@ class CodeAnalyzer:
 
         file_paths_str = [str(f) for f in python_files]
 
-        # Run each analysis tool
-        metrics.update(self._analyze_complexity(file_paths_str, errors))
-        metrics.update(self._analyze_maintainability(file_paths_str, errors))
-        metrics.update(self._analyze_duplication(file_paths_str, errors))
-        metrics.update(self._analyze_coverage(errors))
-        metrics.update(self._analyze_dead_code(file_paths_str, errors))
-        metrics.update(self._analyze_style_issues(file_paths_str, errors))
-        metrics.update(self._analyze_documentation(file_paths_str, errors))
-        metrics.update(self._count_code_elements(python_files, errors))
+        # Every analysis is independent, so launch them together: the run
+        # then takes about as long as the slowest tool (usually pytest)
+        analyses: list[Callable[[], dict[str, Any]]] = [
+            functools.partial(self._analyze_complexity, file_paths_str, errors),
+            functools.partial(self._analyze_maintainability, file_paths_str, errors),
+            functools.partial(self._analyze_dead_code, file_paths_str, errors),
+            functools.partial(self._analyze_style_issues, file_paths_str, errors),
+            functools.partial(self._analyze_documentation, file_paths_str, errors),
+            functools.partial(self._analyze_duplication, file_paths_str, errors),
+            functools.partial(self._analyze_coverage, errors),
+            functools.partial(self._count_code_elements, python_files, errors),
+        ]
+        self._in_run = True
+        self._python_files_cache = python_files
+        try:
+            with ThreadPoolExecutor(max_workers=len(analyses)) as executor:
+                futures = [executor.submit(analyze) for analyze in analyses]
+                # Merge in submission order so results do not depend on timing
+                for future in futures:
+                    metrics.update(future.result())
+        finally:
+            self._in_run = False
+            self._python_files_cache = None
+            self._run_results.clear()
 
         # Calculate maintainability density
         metrics.update(self._calculate_maintainability_density(metrics))
 
+        self._save_file_cache(python_files)
         return metrics, errors
 
     def _run_tool(
-        self, cmd: list[str], timeout: int = 60
+        self,
+        cmd: list[str],
+        timeout: int = 60,
+        text: bool = False,
+        cwd: Path | None = None,
+        isolated: bool = True,
     ) -> subprocess.CompletedProcess:
         """Run a subprocess command with standard settings.
 
+        Output is captured as bytes unless text is requested: the parsers
+        take bytes directly, so decoding it to str first is wasted work.
+
+        Python tools run in isolated mode (-I): modules in the working
+        directory cannot shadow the tool's imports, and user site-packages
+        and PYTHON* variables are not processed at startup. A tool that is
+        only importable without it, say from the user site, is rerun
+        normally and from then on started that way.
+
         Args:
             cmd: Command to run as list of strings
             timeout: Timeout in seconds
+            text: Whether to decode stdout and stderr to str
+            cwd: Directory to run the command in
+            isolated: Whether a ``python -m`` tool may run in isolated mode
 
         Returns:
             Completed process result
         """
-        return subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            check=False,
-            timeout=timeout,
-        )
+        isolated_cmd = self._isolated_command(cmd) if isolated else cmd
+        if isolated_cmd is not cmd:
+            result = self._run_process(isolated_cmd, timeout, text, cwd)
+            if not _is_missing_module(result):
+                return subprocess.CompletedProcess(
+                    cmd, result.returncode, result.stdout, result.stderr
+                )
+            self._needs_site.add(cmd[2])
+        return self._run_process(cmd, timeout, text, cwd)
+
+    def _isolated_command(self, cmd: list[str]) -> list[str]:
+        """Return cmd with -I added if it runs a ``python -m`` tool.
+
+        cmd itself is returned for other commands, and for tools already
+        found to need the user site.
+        """
+        if cmd[:2] == [sys.executable, "-m"] and cmd[2] not in self._needs_site:
+            return [sys.executable, "-I", *cmd[1:]]
+        return cmd
+
+    def _run_process(
+        self, cmd: list[str], timeout: int, text: bool, cwd: Path | None
+    ) -> subprocess.CompletedProcess:
+        """Run cmd to completion, capturing its output, as _run_tool does."""
+        with self._start_process(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=text, cwd=cwd
+        ) as proc:
+            try:
+                stdout, stderr = proc.communicate(timeout=timeout)
+            except BaseException:
+                # Timed out or interrupted: take any helpers down with it
+                _kill_process_group(proc)
+                proc.wait()
+                raise
+        return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+
+    @contextlib.contextmanager
+    def _start_process(
+        self, cmd: list[str], **kwargs: Any
+    ) -> Iterator[subprocess.Popen]:
+        """Start a tool in a session of its own and track it until it exits.
+
+        The new session gives the tool its own process group, so a timeout
+        or cancel() also kills any helper processes it started.
+        """
+        with subprocess.Popen(cmd, start_new_session=True, **kwargs) as proc:
+            with self._processes_lock:
+                self._processes.add(proc)
+                cancelled = self._cancelled.is_set()
+            try:
+                if cancelled:
+                    _kill_process_group(proc)
+                yield proc
+            finally:
+                with self._processes_lock:
+                    self._processes.discard(proc)
+
+    def cancel(self) -> None:
+        """Kill the tools of a run in progress, and any it would still start.
+
+        The run then finishes promptly, reporting the killed tools as
+        errors. The next run_analysis call starts normally.
+        """
+        with self._processes_lock:
+            self._cancelled.set()
+        self._kill_running_processes()
 
-    def _parse_json_output(self, output: str, default: Any = None) -> Any:
-        """Parse JSON output safely.
+    def _kill_running_processes(self) -> None:
+        """Kill every tool process currently running."""
+        with self._processes_lock:
+            processes = list(self._processes)
+        for proc in processes:
+            _kill_process_group(proc)
+
+    def _parse_json_output(self, output: bytes | str, default: Any = None) -> Any:
+        """Parse JSON output safely, using orjson when available.
 
         Args:
-            output: JSON string to parse
+            output: JSON document, as bytes or str
             default: Default value if parsing fails
 
         Returns:
             Parsed JSON or default value
         """
+        loads = orjson.loads if orjson is not None else json.loads
         try:
-            return json.loads(output) if output else default
-        except json.JSONDecodeError:
+            return loads(output) if output else default
+        except ValueError:  # JSONDecodeError, or bytes that are not UTF-8
             return default
 
     def _calculate_percentage(self, count: int, total: int) -> float:
@@ -268,7 +1047,10 @@ class CodeAnalyzer:
         context: str = "scan",
     ) -> None:
         """Append a detailed error message to the errors list."""
-        error_output = result.stderr.strip() or result.stdout.strip()
+        error_output = (
+            _decode_output(result.stderr).strip()
+            or _decode_output(result.stdout).strip()
+        )
         message = (
             f"{tool_name.capitalize()} {context} failed (exit code"
             f" {result.returncode}): {error_output[:200]}"
@@ -280,22 +1062,20 @@ class CodeAnalyzer:
     ) -> dict[str, float]:
         """Analyze cyclomatic complexity using radon."""
         try:
-            cmd = [
-                sys.executable,
-                "-m",
-                "radon",
-                "cc",
-                *files,
-                "-j",
-                "-a",
-            ]
-            result = self._run_tool(cmd)
+            if not self.use_subprocess:
+                results = self._radon_metrics(files)
+                return self._complexity_stats(
+                    [c for r in results for c in r.complexities]
+                )
 
-            if result.returncode != 0:
-                self._report_tool_error(errors, "radon", result, context="complexity")
-                return self._default_complexity_metrics()
+            cmds = [
+                [sys.executable, "-m", "radon", "cc", *batch, "-j", "-a"]
+                for batch in _argv_batches(files)
+            ]
+            if ijson is not None:
+                return self._stream_complexity_stats(cmds, errors)
 
-            data = self._parse_json_output(result.stdout, {})
+            data = self._run_radon_json(cmds, errors, context="complexity")
             if not data:
                 return self._default_complexity_metrics()
 
@@ -308,14 +1088,153 @@ class CodeAnalyzer:
             )
             return self._default_complexity_metrics()
 
+    def _stream_complexity_stats(
+        self, cmds: list[list[str]], errors: list[dict[str, str]], timeout: int = 60
+    ) -> dict[str, float]:
+        """Fold radon cc JSON into statistics while it is being written.
+
+        Avoids holding radon's full output and its parsed form in memory.
+
+        Args:
+            cmds: radon cc commands, one per batch of files, producing JSON
+                on stdout
+            errors: List to append errors to
+            timeout: Timeout in seconds for each command
+
+        Returns:
+            Complexity statistics
+        """
+        failures: list[subprocess.CompletedProcess] = []
+        stats = self._fold_complexities(
+            item
+            for cmd in cmds
+            for item in self._stream_json_items(cmd, failures, timeout)
+        )
+        if failures:
+            self._report_tool_error(errors, "radon", failures[0], context="complexity")
+            return self._default_complexity_metrics()
+
+        return stats
+
+    def _stream_json_items(
+        self,
+        cmd: list[str],
+        failures: list[subprocess.CompletedProcess],
+        timeout: int,
+        parse: Callable[[Any], Iterator[Any]] | None = None,
+    ) -> Iterator[Any]:
+        """Yield the top-level items of a command's JSON output as it runs.
+
+        Items are (key, value) pairs of a JSON object, unless another ijson
+        parser is given. A non-zero exit is recorded in failures once the
+        output is consumed; output a failing command left unparseable ends
+        the items early instead of raising. Python tools run isolated, as
+        with _run_tool.
+        """
+        if parse is None:
+            parse = _json_object_items
+
+        isolated_cmd = self._isolated_command(cmd)
+        if isolated_cmd is not cmd:
+            attempt: list[subprocess.CompletedProcess] = []
+            yielded = False
+            for item in self._stream_process_items(
+                isolated_cmd, attempt, timeout, parse
+            ):
+                yielded = True
+                yield item
+            if yielded or not attempt or not _is_missing_module(attempt[0]):
+                failures.extend(
+                    subprocess.CompletedProcess(cmd, r.returncode, r.stdout, r.stderr)
+                    for r in attempt
+                )
+                return
+            self._needs_site.add(cmd[2])
+        yield from self._stream_process_items(cmd, failures, timeout, parse)
+
+    def _stream_process_items(
+        self,
+        cmd: list[str],
+        failures: list[subprocess.CompletedProcess],
+        timeout: int,
+        parse: Callable[[Any], Iterator[Any]],
+    ) -> Iterator[Any]:
+        """Run cmd once, yielding parse's items of its stdout as it runs."""
+        # stderr goes to a file so a chatty tool cannot block on a full pipe
+        with (
+            tempfile.TemporaryFile() as stderr_file,
+            self._start_process(
+                cmd, stdout=subprocess.PIPE, stderr=stderr_file
+            ) as proc,
+        ):
+            timed_out = threading.Event()
+
+            def kill() -> None:
+                timed_out.set()
+                _kill_process_group(proc)
+
+            timer = threading.Timer(timeout, kill)
+            timer.start()
+            try:
+                try:
+                    yield from parse(proc.stdout)
+                except ijson.JSONError:
+                    # Read the rest so a tool still writing cannot block on
+                    # a full pipe before it exits
+                    proc.communicate()
+                    if proc.returncode == 0:
+                        raise
+                returncode = proc.wait()
+            finally:
+                timer.cancel()
+            if timed_out.is_set():
+                raise subprocess.TimeoutExpired(cmd, timeout)
+            stderr_file.seek(0)
+            stderr = stderr_file.read().decode(errors="replace")
+
+        if returncode != 0:
+            failures.append(subprocess.CompletedProcess(cmd, returncode, "", stderr))
+
+    def _fold_complexities(self, file_items: Any) -> dict[str, float]:
+        """Calculate complexity statistics from (file, blocks) pairs.
+
+        Keeps running totals so the pairs can come from a stream.
+
+        Args:
+            file_items: Iterable of (file path, radon cc blocks) pairs
+
+        Returns:
+            Complexity statistics
+        """
+        total = count = 0
+        max_complexity = 0
+        for _file_path, file_data in file_items:
+            for item in file_data:
+                if isinstance(item, dict) and "complexity" in item:
+                    complexity = int(item["complexity"])
+                    total += complexity
+                    count += 1
+                    max_complexity = max(max_complexity, complexity)
+
+        if not count:
+            return self._default_complexity_metrics()
+
+        return {
+            "avg_complexity": total / count,
+            "max_complexity": max_complexity,
+            "total_functions": count,
+        }
+
     def _default_complexity_metrics(self) -> dict[str, float]:
         """Return default complexity metrics."""
         return {"avg_complexity": 0.0, "max_complexity": 0.0, "total_functions": 0}
 
     def _calculate_complexity_stats(self, data: dict) -> dict[str, float]:
         """Calculate complexity statistics from radon output."""
-        complexities = self._extract_complexities(data)
+        return self._fold_complexities(data.items())
 
+    def _complexity_stats(self, complexities: list[int]) -> dict[str, float]:
+        """Calculate complexity statistics from per-block complexity values."""
         if not complexities:
             return self._default_complexity_metrics()
 
@@ -325,38 +1244,25 @@ class CodeAnalyzer:
             "total_functions": len(complexities),
         }
 
-    def _extract_complexities(self, data: dict) -> list[int]:
-        """Extract complexity values from radon output.
-
-        Args:
-            data: JSON data from radon cc command
-
-        Returns:
-            List of complexity values
-
-        """
-        complexities = []
-        for _file_path, file_data in data.items():
-            for item in file_data:
-                if isinstance(item, dict) and "complexity" in item:
-                    complexities.append(item["complexity"])
-        return complexities
-
     def _analyze_maintainability(
         self, files: list[str], errors: list[dict[str, str]]
     ) -> dict[str, float]:
         """Analyze maintainability index using radon."""
         try:
-            cmd = [sys.executable, "-m", "radon", "mi", *files, "-j"]
-            result = self._run_tool(cmd)
-
-            if result.returncode != 0:
-                self._report_tool_error(
-                    errors, "radon", result, context="maintainability"
-                )
+            if not self.use_subprocess:
+                mi_values = [
+                    r.mi for r in self._radon_metrics(files) if r.mi is not None
+                ]
+                return self._average_maintainability(mi_values)
+
+            cmds = [
+                [sys.executable, "-m", "radon", "mi", *batch, "-j"]
+                for batch in _argv_batches(files)
+            ]
+            data = self._run_radon_json(cmds, errors, context="maintainability")
+            if data is None:
                 return {"maintainability_index": 0.0}
 
-            data = self._parse_json_output(result.stdout, {})
             return self._calculate_avg_maintainability(data)
 
         except Exception as e:
@@ -366,6 +1272,31 @@ class CodeAnalyzer:
             )
             return {"maintainability_index": 0.0}
 
+    def _run_radon_json(
+        self, cmds: list[list[str]], errors: list[dict[str, str]], context: str
+    ) -> dict | None:
+        """Run radon once per batch of files and merge the JSON results.
+
+        radon reports each file under its own key, so the batches' objects
+        merge without overlap.
+
+        Args:
+            cmds: radon commands, one per batch from _argv_batches
+            errors: List to append errors to
+            context: What the run was for, used in error messages
+
+        Returns:
+            Merged results, or None if radon failed
+        """
+        data: dict = {}
+        for cmd in cmds:
+            result = self._run_tool(cmd)
+            if result.returncode != 0:
+                self._report_tool_error(errors, "radon", result, context=context)
+                return None
+            data.update(self._parse_json_output(result.stdout, {}))
+        return data
+
     def _calculate_avg_maintainability(self, data: dict) -> dict[str, float]:
         """Calculate average maintainability index from radon output."""
         mi_values = [
@@ -374,6 +1305,10 @@ class CodeAnalyzer:
             if isinstance(file_data, dict) and "mi" in file_data
         ]
 
+        return self._average_maintainability(mi_values)
+
+    def _average_maintainability(self, mi_values: list[float]) -> dict[str, float]:
+        """Average per-file maintainability index values."""
         if mi_values:
             return {"maintainability_index": sum(mi_values) / len(mi_values)}
         return {"maintainability_index": 0.0}
@@ -383,17 +1318,30 @@ class CodeAnalyzer:
     ) -> dict[str, float]:
         """Analyze code duplication using pylint."""
         try:
+            if not self.use_subprocess:
+                try:
+                    duplicate_count = self._run_on_files(_count_duplicate_blocks, files)
+                    return self._duplication_percentage(duplicate_count)
+                except (AttributeError, TypeError) as e:
+                    # Symilar's API differs in this pylint version
+                    logger.debug(f"In-process duplication check failed: {e}")
+
             result = self._run_pylint_duplication(files)
 
-            if result.returncode != 0:
+            # pylint's exit status is a bit mask; only fatal (1) and usage
+            # (32) errors mean it failed, 8 just reports the duplicate-code
+            # refactoring message
+            if result.returncode & (1 | 32):
                 self._report_tool_error(errors, "pylint", result, context="duplication")
                 return {"code_duplication": 0.0}
 
-            if result.stdout:
-                messages = self._parse_json_output(result.stdout, [])
-                return self._calculate_duplication_metrics(messages)
-
-            return {"code_duplication": 0.0}
+            stdout = result.stdout or b""
+            if isinstance(stdout, str):
+                stdout = stdout.encode()
+            # JSON escapes quotes inside strings, so the quoted symbol only
+            # appears as the value of a duplicate-code message's symbol
+            duplicate_count = stdout.count(_DUPLICATE_CODE_SYMBOL)
+            return self._duplication_percentage(duplicate_count)
 
         except Exception as e:
             logger.debug(f"Error analyzing duplication: {e}")
@@ -404,38 +1352,11 @@ class CodeAnalyzer:
 
     def _run_pylint_duplication(self, files: list[str]) -> subprocess.CompletedProcess:
         """Run pylint for duplication analysis."""
-        pylintrc_content = """[MESSAGES CONTROL]
-disable=all
-enable=duplicate-code
-
-[REPORTS]
-output-format=json
-"""
-        with tempfile.NamedTemporaryFile(
-            mode="w", suffix=".pylintrc", delete=False
-        ) as f:
-            f.write(pylintrc_content)
-            pylintrc_path = f.name
-
-        try:
-            cmd = [
-                sys.executable,
-                "-m",
-                "pylint",
-                *files,
-                f"--rcfile={pylintrc_path}",
-                "--output-format=json",
-            ]
-            return self._run_tool(cmd)
-        finally:
-            Path(pylintrc_path).unlink(missing_ok=True)
-
-    def _calculate_duplication_metrics(self, messages: list) -> dict[str, float]:
-        """Calculate duplication percentage from pylint messages."""
-        duplicate_count = sum(
-            1 for msg in messages if msg.get("symbol") == "duplicate-code"
-        )
+        cmd = [sys.executable, "-m", "pylint", *_DUPLICATION_PYLINT_ARGS, *files]
+        return self._run_tool(cmd)
 
+    def _duplication_percentage(self, duplicate_count: int) -> dict[str, float]:
+        """Estimate the share of duplicated lines from a duplicate count."""
         if duplicate_count == 0:
             return {"code_duplication": 0.0}
 
@@ -454,7 +1375,30 @@ output-format=json
                 logger.debug("No test directory found, skipping coverage analysis.")
                 return {"test_coverage": 0.0}
 
-            coverage = self._run_and_parse_coverage(test_dir, project_root, errors)
+            # Without a Python file pytest has nothing to collect; finding the
+            # first one is cheaper than starting pytest to report that
+            if next(_iter_py_files(test_dir), None) is None:
+                logger.debug("No test files found, skipping coverage analysis.")
+                return {"test_coverage": 0.0}
+
+            # pytest's result can only change with the sources or the tests
+            snapshot = _snapshot_digest(
+                self._snapshot_with_tests(self._get_python_files(), test_dir)
+            )
+            if self._coverage_cache is not None and self._coverage_cache[0] == snapshot:
+                logger.debug("Sources and tests unchanged, reusing test coverage.")
+                return {"test_coverage": self._coverage_cache[1]}
+
+            coverage_errors: list[dict[str, str]] = []
+            coverage = self._run_and_parse_coverage(
+                test_dir, project_root, coverage_errors
+            )
+            errors.extend(coverage_errors)
+            # Failed runs are retried next time rather than cached
+            if not coverage_errors:
+                with self._file_cache_lock:
+                    self._coverage_cache = (snapshot, coverage)
+                    self._file_cache_dirty = True
             return {"test_coverage": coverage}
 
         except subprocess.TimeoutExpired:
@@ -474,10 +1418,9 @@ output-format=json
         self, test_dir: Path, project_root: Path, errors: list[dict[str, str]]
     ) -> float:
         """Run pytest with coverage and parse the result."""
-        module_name = self.source_dir.name
-        logger.info(f"Running coverage analysis for {module_name}...")
+        logger.info(f"Running coverage analysis for {self._module_name}...")
 
-        result = self._run_pytest_coverage(test_dir, project_root, module_name)
+        result = self._run_pytest_coverage(test_dir, project_root, self._module_name)
         coverage = self._parse_coverage_output(result.stdout)
 
         if coverage is not None:
@@ -513,17 +1456,24 @@ output-format=json
     ) -> dict[str, float]:
         """Analyze dead code using vulture."""
         try:
-            result = self._run_vulture(files)
+            if self.use_subprocess:
+                result = self._run_vulture(files)
+
+                # Vulture exits with 3 when it finds dead code
+                if result.returncode not in (0, 3):
+                    self._report_tool_error(errors, "vulture", result)
+                    return {"dead_code": 0.0}
 
-            if result.returncode != 0 and "confidence" not in result.stderr:
-                self._report_tool_error(errors, "vulture", result)
-                return {"dead_code": 0.0}
+                if not result.stdout.strip():
+                    return {"dead_code": 0.0}
 
-            if not result.stdout.strip():
-                return {"dead_code": 0.0}
+                dead_code_count = self._count_vulture_findings(result.stdout)
+            else:
+                dead_code_count = self._count_dead_code_in_process(files)
+                if dead_code_count == 0:
+                    return {"dead_code": 0.0}
 
-            dead_code_count = self._count_vulture_findings(result.stdout)
-            total_elements = max(1, self._count_pattern(r"^\s*(def|class)\s+\w+"))
+            total_elements = max(1, self._count_pattern(_DEF_CLASS_RE))
 
             dead_code_percentage = (dead_code_count / total_elements) * 100
             return {"dead_code": min(dead_code_percentage, 100.0)}
@@ -535,6 +1485,13 @@ output-format=json
             )
             return {"dead_code": 0.0}
 
+    def _vulture_paths(self, files: list[str]) -> list[str]:
+        """Return the files to scan plus the vulture whitelist, if present."""
+        whitelist_path = self.source_dir.parent / ".vulture_whitelist"
+        if whitelist_path.exists():
+            return [*files, str(whitelist_path)]
+        return files
+
     def _run_vulture(self, files: list[str]) -> subprocess.CompletedProcess:
         """Run vulture to find dead code.
 
@@ -542,17 +1499,23 @@ output-format=json
             Completed process result from vulture run
 
         """
-        whitelist_path = self.source_dir.parent / ".vulture_whitelist"
-        cmd = [sys.executable, "-m", "vulture", *files]
+        cmd = [sys.executable, "-m", "vulture", *self._vulture_paths(files)]
+        return self._run_tool(cmd)
 
-        if whitelist_path.exists():
-            cmd.append(str(whitelist_path))
+    def _count_dead_code_in_process(self, files: list[str]) -> int:
+        """Count dead code items using vulture's Python API.
 
-        return self._run_tool(cmd)
+        Returns:
+            Number of unused code items, as the vulture CLI would report
+
+        """
+        return self._run_on_files(_count_dead_code, self._vulture_paths(files))
 
-    def _count_vulture_findings(self, output: str) -> int:
+    def _count_vulture_findings(self, output: bytes | str) -> int:
         """Count the number of dead code items from vulture output.
 
+        Each finding is reported on its own ``path:line: message`` line.
+
         Args:
             output: The stdout from vulture run
 
@@ -560,19 +1523,16 @@ output-format=json
             Number of dead code items found
 
         """
-        count = 0
-        for line in output.strip().split("\n"):
-            if line and ":" in line:
-                count += 1
-        return count
+        if isinstance(output, str):
+            output = output.encode()
+        return len(_VULTURE_FINDING_RE.findall(output))
 
     def _analyze_style_issues(
         self, files: list[str], errors: list[dict[str, str]]
     ) -> dict[str, float | int]:
         """Analyze code style issues using ruff."""
         try:
-            violations = self._run_ruff_check(files, errors)
-            total_issues = len(violations)
+            total_issues, _ = self._ruff_issue_counts(files, errors)
 
             total_lines = self._count_lines()
             style_percentage = self._calculate_percentage(total_issues, total_lines)
@@ -587,29 +1547,80 @@ output-format=json
             errors.append({"tool": "ruff", "message": f"Style analysis error: {e}"})
             return {"style_issues": 0, "style_violations": 0.0}
 
+    def _ruff_issue_counts(
+        self, files: list[str], errors: list[dict[str, str]]
+    ) -> tuple[int, int]:
+        """Return the number of ruff's style and docstring violations.
+
+        Ruff runs with the docstring (D) rules added to the configured ones,
+        once per run_analysis call; D codes are then counted apart from the
+        rest, so they never count as style issues, even when the project's
+        own ruff configuration selects them. Violations are counted as they
+        arrive rather than collected.
+        """
+
+        def run() -> tuple[int, int]:
+            style = docs = 0
+            for violation in self._run_ruff_check(files, errors, extend_select="D"):
+                if _is_docstring_issue(violation):
+                    docs += 1
+                else:
+                    style += 1
+            return style, docs
+
+        return self._per_run("ruff", run)
+
     def _run_ruff_check(
-        self, files: list[str], errors: list[dict[str, str]], select: str | None = None
-    ) -> list:
-        """Run ruff and return violations."""
-        cmd = [
-            sys.executable,
-            "-m",
-            "ruff",
-            "check",
-            *files,
-            "--output-format=json",
-        ]
+        self,
+        files: list[str],
+        errors: list[dict[str, str]],
+        extend_select: str | None = None,
+    ) -> Iterator[Any]:
+        """Run ruff and yield its violations.
+
+        Very long file lists are split over several runs to stay within the
+        operating system's command line limit. With ijson installed each
+        violation is parsed from ruff's output while ruff is still running,
+        so the full report is never held in memory.
+        """
+        options = ["--output-format=json"]
+        if extend_select:
+            options.extend(["--extend-select", extend_select])
+
+        for batch in _argv_batches(files):
+            cmd = [*_ruff_command(), "check", *batch, *options]
+            if ijson is not None:
+                failures: list[subprocess.CompletedProcess] = []
+                yield from self._stream_json_items(
+                    cmd, failures, timeout=60, parse=_json_array_items
+                )
+                for failure in failures:
+                    if "error:" in failure.stderr.lower():
+                        self._report_tool_error(errors, "ruff", failure)
+                continue
+
+            result = self._run_tool(cmd)
 
-        if select:
-            cmd.extend(["--select", select])
+            stderr = _decode_output(result.stderr)
+            if result.returncode != 0 and "error:" in stderr.lower():
+                # Ruff exits with non-zero code if issues are found, so check stderr
+                self._report_tool_error(errors, "ruff", result)
+                # Continue to parse violations even if exit code is non-zero
+            yield from self._parse_ruff_output(result.stdout)
 
-        result = self._run_tool(cmd)
+    def _parse_ruff_output(self, output: bytes | str) -> list:
+        """Parse ruff's JSON diagnostics, returning an empty list on bad output.
+
+        With msgspec installed each diagnostic is decoded straight into a
+        slotted RuffIssue, skipping the fields ViberDash does not read.
+        """
+        if msgspec is not None:
+            try:
+                return list(_RUFF_DECODER.decode(output)) if output else []
+            except msgspec.DecodeError:
+                return []
 
-        if result.returncode != 0 and "error:" in result.stderr.lower():
-            # Ruff exits with non-zero code if issues are found, so check stderr
-            self._report_tool_error(errors, "ruff", result)
-            # Continue to parse violations even if exit code is non-zero
-        violations = self._parse_json_output(result.stdout, [])
+        violations = self._parse_json_output(output, [])
         return violations if isinstance(violations, list) else []
 
     def _analyze_documentation(
@@ -617,10 +1628,9 @@ output-format=json
     ) -> dict[str, float]:
         """Analyze documentation coverage using Ruff docstring checks."""
         try:
-            violations = self._run_ruff_check(files, errors, select="D")
-            total_doc_issues = len(violations)
+            _, total_doc_issues = self._ruff_issue_counts(files, errors)
 
-            total_elements = self._count_pattern(r"^\s*(def|class)\s+\w+")
+            total_elements = self._count_pattern(_DEF_CLASS_RE)
             doc_coverage = self._calculate_doc_coverage(
                 total_doc_issues, total_elements
             )
@@ -652,7 +1662,7 @@ output-format=json
             line_counts = self._get_line_counts_from_radon(
                 [str(f) for f in files], errors
             )
-            total_classes = self._count_pattern(r"^class\s+\w+")
+            total_classes = self._count_pattern(_CLASS_RE)
 
             return {
                 "total_lines": line_counts["total_lines"],
@@ -669,15 +1679,21 @@ output-format=json
         self, files: list[str], errors: list[dict[str, str]]
     ) -> dict[str, int]:
         """Get line counts using radon raw metrics."""
-        cmd = [sys.executable, "-m", "radon", "raw", *files, "-j"]
-        result = self._run_tool(cmd)
+        if not self.use_subprocess:
+            results = self._radon_metrics(files)
+            return {
+                "total_lines": sum(r.loc for r in results),
+                "total_code_lines": sum(r.sloc for r in results),
+            }
 
-        if result.returncode != 0:
-            self._report_tool_error(errors, "radon", result, context="line count")
+        cmds = [
+            [sys.executable, "-m", "radon", "raw", *batch, "-j"]
+            for batch in _argv_batches(files)
+        ]
+        data = self._run_radon_json(cmds, errors, context="line count")
+        if data is None:
             return {"total_lines": 0, "total_code_lines": 0}
 
-        data = self._parse_json_output(result.stdout, {})
-
         total_lines = 0
         total_code_lines = 0
 
@@ -711,37 +1727,179 @@ output-format=json
         density = mi / (code_lines / 1000.0)
         return {"maintainability_density": density}
 
-    def _count_lines(self) -> int:
-        """Count total lines in Python files."""
-        total = 0
-        for py_file in self._get_python_files():
-            try:
-                with open(py_file, encoding="utf-8") as f:
-                    total += len(f.readlines())
-            except Exception:
-                pass
-        return total
+    def _scan_files(self) -> dict[str, int]:
+        """Scan every Python file once and return line and pattern totals.
 
-    def _count_pattern(self, pattern: str) -> int:
-        """Count occurrences of a pattern in Python files."""
-        import re
+        Per-file results are cached by modification time and size, so
+        repeated calls only re-read files that changed. Within one
+        run_analysis call the totals are computed once and shared.
+        """
+        return self._per_run("scan", self._scan_all_files)
 
-        regex = re.compile(pattern, re.MULTILINE)
-        count = 0
+    def _radon_metrics(self, files: list[str]) -> list[_RadonFileMetrics]:
+        """Return radon's in-process results for files.
 
-        for py_file in self._get_python_files():
+        Complexity, maintainability and line counts all read from the
+        cached per-file pass instead of three radon invocations.
+        """
+        return [m.radon for m in self._file_metrics([Path(f) for f in files])]
+
+    def _per_run(self, key: str, compute: Callable[[], _T]) -> _T:
+        """Return compute(), shared by every caller within one run_analysis."""
+        with self._run_locks[key]:
+            if key in self._run_results:
+                return self._run_results[key]  # type: ignore[no-any-return]
+            result = compute()
+            if self._in_run:
+                self._run_results[key] = result
+            return result
+
+    def _scan_all_files(self) -> dict[str, int]:
+        """Sum the cached per-file scan counts over all Python files."""
+        totals = dict.fromkeys(_SCAN_KEYS, 0)
+        for metrics in self._file_metrics(self._get_python_files()):
+            for key, value in metrics.counts.items():
+                totals[key] += value
+        return totals
+
+    def _file_metrics(self, paths: list[Path]) -> list[_FileMetrics]:
+        """Return the per-file scan and radon results for paths.
+
+        Results are cached by (mtime_ns, size), so only files that changed
+        are read again. Each stale file is read once for both its scan
+        counts and, unless radon runs as a subprocess, its radon metrics;
+        those files are processed on threads, or on worker processes when
+        there are enough of them for the CPU-bound work to dominate.
+        Concurrent callers wait for each other instead of reading the same
+        files twice.
+        """
+        with self._file_cache_lock:
+            results: list[_FileMetrics] = []
+            stale: list[tuple[int, Path, tuple[int, int]]] = []
+            for path in paths:
+                try:
+                    stat = path.stat()
+                except OSError:
+                    results.append(_NO_FILE_METRICS)
+                    continue
+                file_key = (stat.st_mtime_ns, stat.st_size)
+                cached = self._file_cache.get(path)
+                if cached is not None and cached[0] == file_key:
+                    results.append(cached[1])
+                else:
+                    stale.append((len(results), path, file_key))
+                    results.append(_NO_FILE_METRICS)
+
+            analyze = functools.partial(_analyze_file, radon=not self.use_subprocess)
+            stale_paths = [str(path) for _, path, _ in stale]
+            if len(stale_paths) >= self.process_pool_min_files:
+                computed = self._map_files(analyze, stale_paths)
+            else:
+                with ThreadPoolExecutor() as executor:
+                    computed = list(executor.map(analyze, stale_paths))
+
+            for (index, path, file_key), metrics in zip(stale, computed, strict=True):
+                self._file_cache[path] = (file_key, metrics)
+                results[index] = metrics
+            if stale:
+                self._file_cache_dirty = True
+            return results
+
+    def _load_file_cache(self, cache_file: Path) -> None:
+        """Fill the per-file cache from cache_file, if it is usable.
+
+        The last test coverage result is restored along with the files. A
+        cache written by another version, or with radon results present
+        when they are not wanted or the other way round, is ignored.
+        """
+        try:
+            with open(cache_file, "rb") as f:
+                data = json.load(f)
+            if (
+                data.get("version") != _FILE_CACHE_VERSION
+                or data.get("radon") != (not self.use_subprocess)
+                or data.get("scan_keys") != list(_SCAN_KEYS)
+            ):
+                return
+            self._file_cache = {
+                Path(path): (
+                    (mtime_ns, size),
+                    _FileMetrics(counts, _RadonFileMetrics(*radon)),
+                )
+                for path, (mtime_ns, size, counts, radon) in data["files"].items()
+            }
+            coverage = data.get("coverage")
+            if coverage is not None:
+                self._coverage_cache = (coverage["snapshot"], float(coverage["value"]))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError, KeyError, AttributeError) as e:
+            logger.debug(f"Ignoring unreadable cache file {cache_file}: {e}")
+
+    def _save_file_cache(self, files: list[Path]) -> None:
+        """Write the per-file cache for files to cache_file, if it changed.
+
+        The last test coverage result is saved with it. The file is
+        replaced atomically, so a concurrent reader never sees
+        a partial write. Entries for files no longer analyzed are dropped.
+        """
+        if self.cache_file is None:
+            return
+        with self._file_cache_lock:
+            if not self._file_cache_dirty:
+                return
+            entries = {}
+            for path in files:
+                cached = self._file_cache.get(path)
+                if cached is not None:
+                    (mtime_ns, size), metrics = cached
+                    entries[str(path)] = [mtime_ns, size, metrics.counts, metrics.radon]
+            data = {
+                "version": _FILE_CACHE_VERSION,
+                "radon": not self.use_subprocess,
+                "scan_keys": list(_SCAN_KEYS),
+                "files": entries,
+            }
+            if self._coverage_cache is not None:
+                snapshot, coverage = self._coverage_cache
+                data["coverage"] = {"snapshot": snapshot, "value": coverage}
+            tmp_path: Path | None = None
             try:
-                with open(py_file, encoding="utf-8") as f:
-                    content = f.read()
-                    count += len(regex.findall(content))
-            except Exception:
-                pass
+                with tempfile.NamedTemporaryFile(
+                    "w",
+                    dir=self.cache_file.parent,
+                    prefix=self.cache_file.name,
+                    suffix=".tmp",
+                    delete=False,
+                ) as f:
+                    tmp_path = Path(f.name)
+                    json.dump(data, f)
+                os.replace(tmp_path, self.cache_file)
+            except OSError as e:
+                logger.debug(f"Could not write cache file {self.cache_file}: {e}")
+                if tmp_path is not None:
+                    tmp_path.unlink(missing_ok=True)
+                return
+            self._file_cache_dirty = False
+
+    def _count_lines(self) -> int:
+        """Count total lines in Python files."""
+        return self._scan_files()["lines"]
 
-        return count
+    def _count_pattern(self, regex: re.Pattern[str]) -> int:
+        """Count occurrences of one of the module's scan patterns.
+
+        Answered from the shared scan; a pattern the scan does not count
+        raises KeyError.
+        """
+        return self._scan_files()[_SCAN_KEY_BY_PATTERN[regex]]
 
     def _find_test_directory(self) -> tuple[Path | None, Path | None]:
         """Find the test directory by searching up from source_dir.
 
+        Not cached: in watch mode a tests directory may appear between runs,
+        and the search costs one stat per level.
+
         Returns:
             Tuple of (test_dir, project_root) or (None, None) if not found
 
@@ -750,8 +1908,9 @@ output-format=json
         search_depth = 5  # Limit search depth
 
         for _ in range(search_depth):
+            # is_dir() is False for missing paths, so one stat suffices
             potential_test_dir = current / "tests"
-            if potential_test_dir.exists() and potential_test_dir.is_dir():
+            if potential_test_dir.is_dir():
                 return potential_test_dir, current
 
             # Stop if we've reached the root
@@ -775,7 +1934,7 @@ output-format=json
             Completed process result from pytest run
 
         """
-        return subprocess.run(
+        return self._run_tool(
             [
                 sys.executable,
                 "-m",
@@ -787,11 +1946,12 @@ output-format=json
                 "--tb=no",
                 "-q",
             ],
-            capture_output=True,
+            timeout=120,  # 2 minute timeout
             text=True,
-            check=False,
             cwd=project_root,
-            timeout=120,  # 2 minute timeout
+            # The project under test may rely on the working directory or
+            # PYTHONPATH being on sys.path
+            isolated=False,
         )
 
     def _parse_coverage_output(self, output: str) -> float | None:
@@ -804,13 +1964,9 @@ output-format=json
             Coverage percentage or None if parsing failed
 
         """
-        for line in output.split("\n"):
-            if line.strip().startswith("TOTAL"):
-                # Line format: "TOTAL    454    36    92%"
-                parts = line.split()
-                if len(parts) >= 4 and parts[-1].endswith("%"):
-                    try:
-                        return float(parts[-1].rstrip("%"))
-                    except ValueError:
-                        pass
+        for match in _COVERAGE_TOTAL_RE.finditer(output):
+            try:
+                return float(match.group(1))
+            except ValueError:
+                pass
         return None
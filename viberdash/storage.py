@@ -2,23 +2,82 @@
 
 import json
 import sqlite3
+import time
 from pathlib import Path
 from typing import Any
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speedup
+    orjson = None  # type: ignore[assignment]
+
+# Prepared once and reused for every insert
+_INSERT_METRICS_SQL = """
+    INSERT INTO metrics (
+        avg_complexity, maintainability_index, maintainability_density,
+        test_coverage, code_duplication, total_functions, total_classes,
+        total_lines, raw_data, ts_ns
+    ) VALUES (
+        :avg_complexity, :maintainability_index, :maintainability_density,
+        :test_coverage, :code_duplication, :total_functions, :total_classes,
+        :total_lines, :raw_data, :ts_ns
+    )
+"""
+
+_INSERT_ERROR_SQL = """
+    INSERT INTO analysis_errors (tool, message)
+    VALUES (?, ?)
+"""
+
+
+def _dumps(data: Any) -> str:
+    """Serialize data to a JSON string, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(data).decode()
+    return json.dumps(data)
+
+
+def _loads(data: str) -> Any:
+    """Parse a JSON string, using orjson when available.
+
+    orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers only
+    need to handle the latter.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
 
 class MetricsStorage:
     """Handles persistence of code metrics in SQLite database."""
 
-    def __init__(self, db_path: Path | None = None):
-        """Initialize storage with database path."""
+    def __init__(self, db_path: Path | str | None = None):
+        """Initialize storage with database path.
+
+        Args:
+            db_path: Database file, or ":memory:" for a throwaway database;
+                defaults to viberdash.db in the working directory
+        """
         if db_path is None:
             db_path = Path.cwd() / "viberdash.db"
         self.db_path = db_path
+
+        # One long-lived connection; writes take the lock up front
+        self.conn = sqlite3.connect(self.db_path, isolation_level="IMMEDIATE")
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.execute("PRAGMA mmap_size=268435456")
         self.init_db()
 
+    def close(self) -> None:
+        """Close the database connection."""
+        self.conn.close()
+
     def init_db(self) -> None:
         """Create database and tables if they don't exist."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.conn as conn:
             conn.execute(
                 """
                 CREATE TABLE IF NOT EXISTS metrics (
@@ -67,7 +126,27 @@ class MetricsStorage:
                     "ALTER TABLE metrics ADD COLUMN maintainability_density REAL"
                 )
 
-            conn.commit()
+            # Add nanosecond insert time column; CURRENT_TIMESTAMP only has
+            # second precision, which cannot order scans saved close together
+            if "ts_ns" not in columns:
+                conn.execute(
+                    "ALTER TABLE metrics ADD COLUMN ts_ns INTEGER NOT NULL DEFAULT 0"
+                )
+                # Backfill existing rows from their second-precision timestamp
+                conn.execute(
+                    """
+                    UPDATE metrics
+                    SET ts_ns = COALESCE(
+                        CAST(strftime('%s', timestamp) AS INTEGER) * 1000000000, 0
+                    )
+                """
+                )
+            conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_ts_ns
+                ON metrics(ts_ns DESC)
+            """
+            )
 
     def save_metrics(
         self, metrics: dict[str, Any], errors: list[dict[str, str]]
@@ -79,8 +158,38 @@ class MetricsStorage:
         Returns:
             ID of the inserted metrics record
         """
-        # Extract main metrics
-        record = {
+        return self.save_metrics_batch([metrics], errors)
+
+    def save_metrics_batch(
+        self,
+        metrics_list: list[dict[str, Any]],
+        errors: list[dict[str, str]] | None = None,
+    ) -> int:
+        """Save several metrics records and errors in a single transaction.
+        Args:
+            metrics_list: Dictionaries containing metric values
+            errors: A list of errors encountered during analysis
+        Returns:
+            ID of the last inserted metrics record
+        """
+        records = [self._metrics_record(metrics) for metrics in metrics_list]
+
+        with self.conn as conn:
+            conn.executemany(_INSERT_METRICS_SQL, records)
+            lastrowid = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+
+            # Save errors
+            if errors:
+                error_records = [
+                    (err.get("tool"), err.get("message")) for err in errors
+                ]
+                conn.executemany(_INSERT_ERROR_SQL, error_records)
+
+        return lastrowid if records else 0
+
+    def _metrics_record(self, metrics: dict[str, Any]) -> dict[str, Any]:
+        """Extract the main metric columns from a metrics dictionary."""
+        return {
             "avg_complexity": metrics.get("avg_complexity", 0.0),
             "maintainability_index": metrics.get("maintainability_index", 0.0),
             "maintainability_density": metrics.get("maintainability_density", 0.0),
@@ -89,59 +198,24 @@ class MetricsStorage:
             "total_functions": metrics.get("total_functions", 0),
             "total_classes": metrics.get("total_classes", 0),
             "total_lines": metrics.get("total_lines", 0),
-            "raw_data": json.dumps(metrics),  # Store complete data as JSON
+            "raw_data": _dumps(metrics),  # Store complete data as JSON
+            "ts_ns": time.time_ns(),
         }
 
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                INSERT INTO metrics (
-                    avg_complexity, maintainability_index, maintainability_density,
-                    test_coverage, code_duplication, total_functions, total_classes,
-                    total_lines, raw_data
-                ) VALUES (
-                    :avg_complexity, :maintainability_index, :maintainability_density,
-                    :test_coverage, :code_duplication, :total_functions, :total_classes,
-                    :total_lines, :raw_data
-                )
-            """,
-                record,
-            )
-            lastrowid = cursor.lastrowid
-
-            # Save errors
-            if errors:
-                error_records = [
-                    (err.get("tool"), err.get("message")) for err in errors
-                ]
-                cursor.executemany(
-                    """
-                    INSERT INTO analysis_errors (tool, message)
-                    VALUES (?, ?)
-                """,
-                    error_records,
-                )
-
-            conn.commit()
-            return lastrowid if lastrowid is not None else 0
-
     def get_latest(self) -> dict[str, Any] | None:
         """Get the most recent metrics entry."""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.execute(
-                """
-                SELECT * FROM metrics
-                ORDER BY timestamp DESC
-                LIMIT 1
+        cursor = self.conn.execute(
             """
-            )
-            row = cursor.fetchone()
+            SELECT * FROM metrics
+            ORDER BY ts_ns DESC, id DESC
+            LIMIT 1
+        """
+        )
+        row = cursor.fetchone()
 
-            if row:
-                return self._row_to_dict(row)
-            return None
+        if row:
+            return self._row_to_dict(row)
+        return None
 
     def get_history(self, limit: int = 20) -> list[dict[str, Any]]:
         """Get historical metrics entries.
@@ -153,35 +227,31 @@ class MetricsStorage:
             List of metric dictionaries, newest first
 
         """
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.execute(
-                """
-                SELECT * FROM metrics
-                ORDER BY timestamp DESC
-                LIMIT ?
-            """,
-                (limit,),
-            )
+        cursor = self.conn.execute(
+            """
+            SELECT * FROM metrics
+            ORDER BY ts_ns DESC, id DESC
+            LIMIT ?
+        """,
+            (limit,),
+        )
 
-            return [self._row_to_dict(row) for row in cursor.fetchall()]
+        return [self._row_to_dict(row) for row in cursor.fetchall()]
 
     def get_previous(self) -> dict[str, Any] | None:
         """Get the second most recent metrics entry (for delta calculation)."""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.execute(
-                """
-                SELECT * FROM metrics
-                ORDER BY timestamp DESC
-                LIMIT 1 OFFSET 1
+        cursor = self.conn.execute(
             """
-            )
-            row = cursor.fetchone()
+            SELECT * FROM metrics
+            ORDER BY ts_ns DESC, id DESC
+            LIMIT 1 OFFSET 1
+        """
+        )
+        row = cursor.fetchone()
 
-            if row:
-                return self._row_to_dict(row)
-            return None
+        if row:
+            return self._row_to_dict(row)
+        return None
 
     def _row_to_dict(self, row: sqlite3.Row) -> dict[str, Any]:
         """Convert database row to dictionary."""
@@ -189,7 +259,7 @@ class MetricsStorage:
         # Parse raw_data JSON if present
         if result.get("raw_data"):
             try:
-                raw_data = json.loads(result["raw_data"])
+                raw_data = _loads(result["raw_data"])
                 result["raw_data"] = raw_data
                 # Extract dead_code from raw_data if present
                 if "dead_code" in raw_data:
@@ -226,17 +296,38 @@ class MetricsStorage:
         Returns:
             A list of error dictionaries, newest first
         """
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.execute(
-                """
-                SELECT * FROM analysis_errors
-                ORDER BY timestamp DESC
-                LIMIT ?
-            """,
-                (limit,),
-            )
-            return [dict(row) for row in cursor.fetchall()]
+        cursor = self.conn.execute(
+            """
+            SELECT * FROM analysis_errors
+            ORDER BY timestamp DESC, id DESC
+            LIMIT ?
+        """,
+            (limit,),
+        )
+        return [dict(row) for row in cursor.fetchall()]
+
+    def get_dashboard_state(
+        self, history_limit: int = 20, error_limit: int = 5
+    ) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+        """Get history and recent errors from one consistent read.
+
+        Both queries run in a single read transaction, so a concurrent save
+        cannot land between them.
+
+        Args:
+            history_limit: Maximum number of metrics entries to return
+            error_limit: Maximum number of errors to return
+
+        Returns:
+            Tuple of (history, errors), both newest first
+        """
+        self.conn.execute("BEGIN")
+        try:
+            history = self.get_history(limit=history_limit)
+            errors = self.get_recent_errors(limit=error_limit)
+        finally:
+            self.conn.commit()
+        return history, errors
 
     def cleanup_old_entries(self, keep_days: int = 30) -> int:
         """Remove entries older than specified days.
@@ -248,7 +339,7 @@ class MetricsStorage:
             Number of deleted entries
 
         """
-        with sqlite3.connect(self.db_path) as conn:
+        with self.conn as conn:
             cursor = conn.execute(
                 """
                 DELETE FROM metrics
@@ -267,5 +358,4 @@ class MetricsStorage:
             )
             deleted_errors = cursor.rowcount
 
-            conn.commit()
-            return deleted_metrics + deleted_errors
+        return deleted_metrics + deleted_errors
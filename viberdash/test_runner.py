@@ -1,7 +1,7 @@
 import subprocess
+import tomllib
 from pathlib import Path
 
-import tomli
 from rich.console import Console
 from rich.panel import Panel
 
@@ -32,7 +32,7 @@ def run_external_tests() -> None:
 
     pyproject_path = project_root / "pyproject.toml"
     with open(pyproject_path, "rb") as f:
-        config = tomli.load(f)
+        config = tomllib.load(f)
 
     test_command = config.get("tool", {}).get("viberdash", {}).get("test_command")
 
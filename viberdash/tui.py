@@ -1,7 +1,10 @@
 """Terminal UI for ViberDash using Rich."""
 
+import functools
+from collections.abc import Mapping
 from datetime import datetime
-from typing import Any
+from types import MappingProxyType
+from typing import Any, NamedTuple
 
 from rich import box
 from rich.align import Align
@@ -11,32 +14,101 @@ from rich.panel import Panel
 from rich.table import Table
 from rich.text import Text
 
+# Sparkline bars from lowest to highest
+_SPARK_CHARS = "▁▂▃▄▅▆▇█"
+# Same bars as a tuple, so indexing hands back the stored one-char strings
+_SPARK_GLYPHS = tuple(_SPARK_CHARS)
+
+# (status, color) indexed by 0 = good, 1 = ok, 2 = bad
+_STATUS_TABLE = (("✓ Good", "green"), ("~ OK", "yellow"), ("✗ Bad", "red"))
+
+# Delta markup keyed by (is_improvement, decreased)
+_DELTA_FORMATS = {
+    (True, True): "[green]↓ {:.1f}[/green]",
+    (True, False): "[green]↑ {:.1f}[/green]",
+    (False, True): "[red]↓ {:.1f}[/red]",
+    (False, False): "[red]↑ {:.1f}[/red]",
+}
+
+# Count changes are neutral, so only the direction varies; keyed by decreased
+_INT_DELTA_FORMATS = {
+    True: "[yellow]↓ {}[/yellow]",
+    False: "[yellow]↑ {}[/yellow]",
+}
+
+
+class _MetricRow(NamedTuple):
+    """How one trended metric is shown in the metrics table."""
+
+    label: str
+    key: str
+    threshold_key: str
+    lower_is_better: bool
+    suffix: str = ""
+    # Used when the latest or previous entry lacks the metric
+    default: float | None = 0
+    # Used when a history entry lacks the metric
+    trend_default: float = 0
+
+
+_METRIC_ROWS = (
+    _MetricRow(
+        "Cyclomatic Complexity", "avg_complexity", "cyclomatic_complexity", True
+    ),
+    _MetricRow(
+        "Maintainability Density",
+        "maintainability_density",
+        "maintainability_density",
+        False,
+        default=None,
+    ),
+    _MetricRow("Test Coverage", "test_coverage", "test_coverage", False, "%"),
+    _MetricRow("Code Duplication", "code_duplication", "code_duplication", True, "%"),
+    _MetricRow("Dead Code", "dead_code", "dead_code", True, "%"),
+    _MetricRow("Style Violations", "style_violations", "style_violations", True, "%"),
+    _MetricRow(
+        "Documentation Coverage",
+        "doc_coverage",
+        "doc_coverage",
+        False,
+        "%",
+        default=100,
+        trend_default=100,
+    ),
+)
+
+# Read-only; instances merge overrides into a shallow copy
+DEFAULT_THRESHOLDS: Mapping[str, Mapping[str, float]] = MappingProxyType(
+    {
+        "cyclomatic_complexity": MappingProxyType({"good": 5.0, "bad": 10.0}),
+        "maintainability_index": MappingProxyType({"good": 85.0, "bad": 65.0}),
+        "maintainability_density": MappingProxyType({"good": 70.0, "bad": 50.0}),
+        "test_coverage": MappingProxyType({"good": 80.0, "bad": 60.0}),
+        "code_duplication": MappingProxyType({"good": 5.0, "bad": 15.0}),
+        "dead_code": MappingProxyType({"good": 5.0, "bad": 15.0}),
+        "style_violations": MappingProxyType({"good": 10.0, "bad": 25.0}),
+        "doc_coverage": MappingProxyType({"good": 80.0, "bad": 60.0}),
+    }
+)
+
+# One console for every dashboard; it writes to whatever sys.stdout is current
+_SHARED_CONSOLE = Console()
+
 
 class DashboardUI:
     """Handles the terminal UI display using Rich."""
 
     def __init__(self, thresholds: dict[str, dict[str, float]] | None = None):
         """Initialize UI with optional threshold configuration."""
-        self.console = Console()
+        self.console = _SHARED_CONSOLE
         # Merge provided thresholds with defaults
-        default_thresholds = self._default_thresholds()
-        if thresholds:
-            # Update defaults with provided thresholds
-            default_thresholds.update(thresholds)
-        self.thresholds = default_thresholds
-
-    def _default_thresholds(self) -> dict[str, dict[str, float]]:
-        """Return default threshold values."""
-        return {
-            "cyclomatic_complexity": {"good": 5.0, "bad": 10.0},
-            "maintainability_index": {"good": 85.0, "bad": 65.0},
-            "maintainability_density": {"good": 70.0, "bad": 50.0},
-            "test_coverage": {"good": 80.0, "bad": 60.0},
-            "code_duplication": {"good": 5.0, "bad": 15.0},
-            "dead_code": {"good": 5.0, "bad": 15.0},
-            "style_violations": {"good": 10.0, "bad": 25.0},
-            "doc_coverage": {"good": 80.0, "bad": 60.0},
+        self.thresholds: dict[str, Mapping[str, float]] = {
+            **DEFAULT_THRESHOLDS,
+            **(thresholds or {}),
         }
+        # Flat per-metric bounds for the render path, read once per lookup
+        self._good = {k: v.get("good", 0) for k, v in self.thresholds.items()}
+        self._bad = {k: v.get("bad", 0) for k, v in self.thresholds.items()}
 
     def display_dashboard(
         self,
@@ -50,9 +122,6 @@ class DashboardUI:
             history: List of historical metrics (newest first)
             errors: List of recent analysis errors
         """
-        # Clear terminal
-        self.console.clear()
-
         # Create layout
         layout = Layout()
         layout.split_column(
@@ -62,8 +131,13 @@ class DashboardUI:
             Layout(self._create_footer(), size=3),
         )
 
-        # Print layout using height-1 to prevent using the last line
-        self.console.print(layout, height=self.console.height - 1)
+        # Buffer the clear and the redraw so the frame goes out in one write
+        with self.console:
+            # Clear terminal
+            self.console.clear()
+
+            # Print layout using height-1 to prevent using the last line
+            self.console.print(layout, height=self.console.height - 1)
 
     def _create_header(self, metrics: dict[str, Any]) -> Panel:
         """Create dashboard header."""
@@ -106,81 +180,21 @@ class DashboardUI:
         # Get previous metrics for delta calculation
         previous = history[1] if len(history) > 1 else None
 
-        # Add rows for each metric
-        self._add_metric_row(
-            table,
-            "Cyclomatic Complexity",
-            latest.get("avg_complexity", 0),
-            previous.get("avg_complexity", 0) if previous else None,
-            [h.get("avg_complexity", 0) for h in reversed(history)],
-            "cyclomatic_complexity",
-            lower_is_better=True,
-        )
-
-        self._add_metric_row(
-            table,
-            "Maintainability Density",
-            latest.get("maintainability_density"),
-            previous.get("maintainability_density") if previous else None,
-            [h.get("maintainability_density", 0) for h in reversed(history)],
-            "maintainability_density",
-            lower_is_better=False,
-        )
-
-        self._add_metric_row(
-            table,
-            "Test Coverage",
-            latest.get("test_coverage", 0),
-            previous.get("test_coverage", 0) if previous else None,
-            [h.get("test_coverage", 0) for h in reversed(history)],
-            "test_coverage",
-            lower_is_better=False,
-            suffix="%",
-        )
-
-        self._add_metric_row(
-            table,
-            "Code Duplication",
-            latest.get("code_duplication", 0),
-            previous.get("code_duplication", 0) if previous else None,
-            [h.get("code_duplication", 0) for h in reversed(history)],
-            "code_duplication",
-            lower_is_better=True,
-            suffix="%",
-        )
-
-        self._add_metric_row(
-            table,
-            "Dead Code",
-            latest.get("dead_code", 0),
-            previous.get("dead_code", 0) if previous else None,
-            [h.get("dead_code", 0) for h in reversed(history)],
-            "dead_code",
-            lower_is_better=True,
-            suffix="%",
-        )
-
-        self._add_metric_row(
-            table,
-            "Style Violations",
-            latest.get("style_violations", 0),
-            previous.get("style_violations", 0) if previous else None,
-            [h.get("style_violations", 0) for h in reversed(history)],
-            "style_violations",
-            lower_is_better=True,
-            suffix="%",
-        )
+        # Extract every trend column in a single pass over the history
+        trends = self._trend_columns(history)
 
-        self._add_metric_row(
-            table,
-            "Documentation Coverage",
-            latest.get("doc_coverage", 100),
-            previous.get("doc_coverage", 100) if previous else None,
-            [h.get("doc_coverage", 100) for h in reversed(history)],
-            "doc_coverage",
-            lower_is_better=False,
-            suffix="%",
-        )
+        # Add rows for each metric
+        for spec, trend_data in zip(_METRIC_ROWS, trends, strict=True):
+            self._add_metric_row(
+                table,
+                spec.label,
+                latest.get(spec.key, spec.default),
+                previous.get(spec.key, spec.default) if previous else None,
+                trend_data,
+                spec.threshold_key,
+                lower_is_better=spec.lower_is_better,
+                suffix=spec.suffix,
+            )
 
         # Add separator
         table.add_row("", "", "", "", "")
@@ -232,6 +246,15 @@ class DashboardUI:
 
         return table
 
+    def _trend_columns(self, history: list[dict[str, Any]]) -> list[list[float]]:
+        """Split history into one oldest-first value list per _METRIC_ROWS entry."""
+        keys = [(spec.key, spec.trend_default) for spec in _METRIC_ROWS]
+        columns: list[list[float]] = [[] for _ in keys]
+        for row in reversed(history):
+            for column, (key, default) in zip(columns, keys, strict=True):
+                column.append(row.get(key, default))
+        return columns
+
     def _create_issues_panel(self, errors: list[dict[str, Any]]) -> Panel:
         """Create a panel to display recent analysis errors."""
         error_text = Text()
@@ -315,14 +338,11 @@ class DashboardUI:
         if abs(delta) < 0.01:
             return "→ 0.0"
 
-        # Determine color based on whether improvement or not
-        is_improvement = (delta < 0 and lower_is_better) or (
-            delta > 0 and not lower_is_better
+        # A decrease is an improvement exactly when lower is better
+        decreased = delta < 0
+        return _DELTA_FORMATS[(decreased == lower_is_better, decreased)].format(
+            abs(delta)
         )
-        color = "green" if is_improvement else "red"
-        arrow = "↓" if delta < 0 else "↑"
-
-        return f"[{color}]{arrow} {abs(delta):.1f}[/{color}]"
 
     def _format_int_delta(self, current: int, previous: int | None) -> str:
         """Format integer delta."""
@@ -333,10 +353,7 @@ class DashboardUI:
         if delta == 0:
             return "→ 0"
 
-        color = "yellow"  # Neutral for count changes
-        arrow = "↓" if delta < 0 else "↑"
-
-        return f"[{color}]{arrow} {abs(delta)}[/{color}]"
+        return _INT_DELTA_FORMATS[delta < 0].format(abs(delta))
 
     def _get_status(
         self, value: float | None, threshold_key: str, lower_is_better: bool
@@ -346,24 +363,16 @@ class DashboardUI:
         if value is None:
             return "? N/A", "dim"
 
-        thresholds = self.thresholds.get(threshold_key, {})
-        good = thresholds.get("good", 0)
-        bad = thresholds.get("bad", 0)
+        good = self._good.get(threshold_key, 0)
+        bad = self._bad.get(threshold_key, 0)
 
+        # 0 when the good threshold is met, otherwise 1 + whether the bad
+        # threshold is reached
         if lower_is_better:
-            if value <= good:
-                return "✓ Good", "green"
-            elif value >= bad:
-                return "✗ Bad", "red"
-            else:
-                return "~ OK", "yellow"
+            index = (value > good) * (1 + (value >= bad))
         else:
-            if value >= good:
-                return "✓ Good", "green"
-            elif value <= bad:
-                return "✗ Bad", "red"
-            else:
-                return "~ OK", "yellow"
+            index = (value < good) * (1 + (value <= bad))
+        return _STATUS_TABLE[index]
 
     def _convert_to_quality_scores(
         self, values: list[float], threshold_key: str, lower_is_better: bool
@@ -372,59 +381,37 @@ class DashboardUI:
         if not values:
             return []
 
-        thresholds = self.thresholds.get(threshold_key, {})
-        good_threshold = thresholds.get("good", 0)
-        bad_threshold = thresholds.get("bad", 0)
+        good = self._good.get(threshold_key, 0)
+        bad = self._bad.get(threshold_key, 0)
 
-        quality_scores = []
-        for value in values:
+        if good == bad:
+            # No band to interpolate over: a value is either good or bad
             if lower_is_better:
-                # For metrics where lower is better (e.g., complexity)
-                if value <= good_threshold:
-                    score = 1.0  # Good
-                elif value >= bad_threshold:
-                    score = 0.0  # Bad
-                else:
-                    # Linear interpolation between good and bad
-                    score = 1.0 - (value - good_threshold) / (
-                        bad_threshold - good_threshold
-                    )
-            else:
-                # For metrics where higher is better (e.g., coverage)
-                if value >= good_threshold:
-                    score = 1.0  # Good
-                elif value <= bad_threshold:
-                    score = 0.0  # Bad
-                else:
-                    # Linear interpolation between bad and good
-                    score = (value - bad_threshold) / (good_threshold - bad_threshold)
-
-            quality_scores.append(score)
-
-        return quality_scores
+                return [1.0 if value <= good else 0.0 for value in values]
+            return [1.0 if value >= good else 0.0 for value in values]
+
+        # Linear interpolation from bad (0.0) to good (1.0), clamped; the
+        # same expression covers both directions since (good - bad) carries
+        # the sign
+        span = good - bad
+        return [min(1.0, max(0.0, (value - bad) / span)) for value in values]
 
     def _create_sparkline(self, data: list[float]) -> str:
         """Create a simple sparkline visualization."""
         if not data or len(data) < 2:
             return ""
 
-        # Normalize data to 0-7 range for spark characters
-        spark_chars = "▁▂▃▄▅▆▇█"
-
         # For quality scores, we want to invert the display
         # so that good (1.0) shows as low bars and bad (0.0) shows as high bars
-        sparkline = ""
-        for value in data:
-            # Invert: good quality (1.0) -> low bar, bad quality (0.0) -> high bar
-            inverted = 1.0 - value
-            index = int(inverted * (len(spark_chars) - 1))
-            index = max(0, min(index, len(spark_chars) - 1))  # Ensure valid index
-            sparkline += spark_chars[index]
-
-        return sparkline
-
-    def _create_footer(self) -> Panel:
-        """Create dashboard footer."""
+        top = len(_SPARK_GLYPHS) - 1
+        return "".join(
+            _SPARK_GLYPHS[max(0, min(int((1.0 - value) * top), top))] for value in data
+        )
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def _create_footer() -> Panel:
+        """Create dashboard footer; it never changes, so it is built once."""
         footer_text = Text()
         footer_text.append("Press Ctrl+C to exit", style="dim white")
         footer_text.append(" | ", style="dim white")
@@ -434,10 +421,14 @@ class DashboardUI:
 
     def show_scanning(self) -> None:
         """Show scanning status."""
-        self.console.print(
-            Panel(
-                Align.center(Text("Scanning code...", style="bold green")),
-                box=box.ROUNDED,
-                style="green",
-            )
+        self.console.print(self._create_scanning_panel())
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def _create_scanning_panel() -> Panel:
+        """Create the scanning status panel; it never changes, so it is built once."""
+        return Panel(
+            Align.center(Text("Scanning code...", style="bold green")),
+            box=box.ROUNDED,
+            style="green",
         )
@@ -2,12 +2,13 @@
 
 import signal
 import sys
-import time
+import threading
+import tomllib
+from collections import deque
 from pathlib import Path
 from typing import Any
 
 import click
-import tomli
 from rich.console import Console
 
 from .analyzer import CodeAnalyzer
@@ -15,23 +16,49 @@ from .storage import MetricsStorage
 from .test_runner import run_external_tests
 from .tui import DashboardUI
 
+# Number of scans shown in the dashboard trends
+HISTORY_LIMIT = 20
+
+# Per-file analysis results kept between runs, unless cache_file is configured
+_DEFAULT_CACHE_FILE = ".viberdash_cache.json"
+
 
 class ViberDashRunner:
     """Main application runner that orchestrates the monitoring loop."""
 
-    def __init__(self, source_dir: Path, config: dict[str, Any] | None = None):
-        """Initialize runner with source directory and configuration."""
+    def __init__(
+        self,
+        source_dir: Path,
+        config: dict[str, Any] | None = None,
+        analyzer: CodeAnalyzer | None = None,
+    ):
+        """Initialize runner with source directory and configuration.
+
+        Args:
+            source_dir: Directory to monitor
+            config: ViberDash configuration
+            analyzer: Analyzer to reuse, e.g. one that already walked
+                source_dir; a new one is created if not given
+        """
         self.source_dir = Path(source_dir).resolve()
         self.config = config or {}
         self.console = Console()
 
-        # Initialize components
-        self.analyzer = CodeAnalyzer(self.source_dir, config=self.config)
+        # Initialize components once; every scan reuses them
+        self.analyzer = analyzer or CodeAnalyzer(self.source_dir, config=self.config)
         self.storage = MetricsStorage()
         self.ui = DashboardUI(thresholds=self.config.get("thresholds"))
 
-        # Control flag for graceful shutdown
+        # Control flag for graceful shutdown; the event also wakes the
+        # loop from its wait between scans
         self.running = True
+        self._stop = threading.Event()
+
+        # Trend window, newest first; the oldest entry drops off on append
+        self._history: deque[dict[str, Any]] = deque(maxlen=HISTORY_LIMIT)
+
+        # Files as of the last completed scan; unchanged files skip the scan
+        self._last_snapshot: tuple[tuple[str, int, int], ...] | None = None
 
         # Set up signal handlers
         signal.signal(signal.SIGINT, self._signal_handler)
@@ -41,6 +68,10 @@ class ViberDashRunner:
         """Handle shutdown signals gracefully."""
         _ = signum, frame  # Unused but required by signal handler interface
         self.running = False
+        self._stop.set()
+        # Tools run in sessions of their own and miss the terminal's signal;
+        # stop them so an interrupted scan does not wait for them to finish
+        self.analyzer.cancel()
         self.console.print("\n[yellow]Shutting down ViberDash...[/yellow]")
         sys.exit(0)
 
@@ -59,28 +90,39 @@ class ViberDashRunner:
             "[yellow]Note: Coverage analysis runs live tests on each scan[/yellow]\n"
         )
 
-        # Initial scan
-        self._perform_scan()
-
-        # Main loop
-        while self.running:
-            try:
-                # Wait for the specified interval
-                time.sleep(interval)
-
-                # Perform scan
-                if self.running:
-                    self._perform_scan()
-
-            except KeyboardInterrupt:
-                break
-            except Exception as e:
-                self.console.print(f"[red]Error in main loop: {e}[/red]")
-                time.sleep(5)  # Brief pause before retrying
+        try:
+            # Initial scan
+            self._perform_scan()
+
+            # Main loop
+            while self.running:
+                try:
+                    # Wait for the specified interval, or until asked to stop
+                    if self._stop.wait(interval):
+                        break
+
+                    # Perform scan
+                    if self.running:
+                        self._perform_scan()
+
+                except KeyboardInterrupt:
+                    break
+                except Exception as e:
+                    self.console.print(f"[red]Error in main loop: {e}[/red]")
+                    self._stop.wait(5)  # Brief pause before retrying
+        finally:
+            # Also runs when the signal handler exits via SystemExit
+            self.analyzer.close()
+            self.storage.close()
 
     def _perform_scan(self) -> None:
         """Perform a single scan cycle."""
         try:
+            # Nothing changed since the last scan: the dashboard is current
+            snapshot = self.analyzer.source_snapshot()
+            if snapshot == self._last_snapshot:
+                return
+
             # Show scanning status
             self.ui.show_scanning()
 
@@ -89,13 +131,20 @@ class ViberDashRunner:
 
             # Save to database
             self.storage.save_metrics(metrics, errors)
+            # A scan with errors (e.g. a tool timed out) is retried next time
+            self._last_snapshot = None if errors else snapshot
 
-            # Get history for trends
-            history = self.storage.get_history(limit=20)
-            recent_errors = self.storage.get_recent_errors(limit=5)
+            # Get history for trends; once the window is loaded only the
+            # row just saved needs fetching
+            history_limit = 1 if self._history else HISTORY_LIMIT
+            new_rows, recent_errors = self.storage.get_dashboard_state(
+                history_limit=history_limit, error_limit=5
+            )
+            self._history.extendleft(reversed(new_rows))
 
             # Update display
-            if history:
+            if self._history:
+                history = list(self._history)
                 self.ui.display_dashboard(history[0], history, recent_errors)
 
         except Exception as e:
@@ -111,7 +160,7 @@ def load_config() -> dict[str, Any]:
 
     try:
         with open(config_path, "rb") as f:
-            pyproject = tomli.load(f)
+            pyproject = tomllib.load(f)
             tool_config = pyproject.get("tool", {})
             viberdash_config: dict[str, Any] = tool_config.get("viberdash", {})
             return viberdash_config
@@ -167,7 +216,7 @@ def monitor(source_dir: Path | None, interval: int, config: Path | None) -> None
     if config:
         try:
             with open(config, "rb") as f:
-                config_data = tomli.load(f)
+                config_data = tomllib.load(f)
                 viberdash_config = config_data.get("tool", {}).get("viberdash", {})
         except Exception as e:
             console.print(f"[red]Error loading config: {e}[/red]")
@@ -189,9 +238,14 @@ def monitor(source_dir: Path | None, interval: int, config: Path | None) -> None
         sys.exit(1)
 
     # Check if it contains Python files
-    # Create a temporary analyzer to check filtered file count
-    temp_analyzer = CodeAnalyzer(source_dir, viberdash_config)
-    py_files = temp_analyzer._get_python_files()
+    # The runner reuses this analyzer, along with its gitignore spec. Its
+    # per-file results persist next to the metrics database by default, so
+    # a restarted dashboard only rescans files that changed
+    analyzer = CodeAnalyzer(
+        source_dir,
+        {"cache_file": Path.cwd() / _DEFAULT_CACHE_FILE, **viberdash_config},
+    )
+    py_files = analyzer._get_python_files()
     if not py_files:
         console.print(f"[red]Error: No Python files found in: {source_dir}[/red]")
         console.print(
@@ -208,7 +262,7 @@ def monitor(source_dir: Path | None, interval: int, config: Path | None) -> None
 
     # Create and run the application
     try:
-        runner = ViberDashRunner(source_dir, viberdash_config)
+        runner = ViberDashRunner(source_dir, viberdash_config, analyzer=analyzer)
         runner.run(interval)
     except Exception as e:
         console.print(f"[red]Fatal error: {e}[/red]")